@@ -13,8 +13,12 @@ Authors:
     Oct. 7th, 2014 (added tests)
 """
 
+import copy
+import ctypes
+import mmap
 import re
-from copy import deepcopy
+from array import array
+from collections import deque
 
 from Directions import *
 from Die import *
@@ -42,15 +46,57 @@ class Board(object):
     GOAL     = 'G'
     START    = 'S'
     
+    ##distance table entry for states that can not reach the goal
+    UNREACHABLE = 0xFFFFFFFF
+    ##predecessor table entry for a direction nothing rolls in from
+    NO_STATE = 0xFFFFFFFF
+    
+    ##first bytes of a file written by saveShared
+    SHARED_MAGIC = b"SDMB"
+    ##bits of the header of a shared board file for the optional sections
+    SHARED_SUCCESSORS = 1
+    SHARED_GOAL_DISTANCES = 2
+    SHARED_GRID_DISTANCES = 4
+    
+    ##the cell characters as stored in the grid, one byte each
+    OBSTACLE_CODE = ord(OBSTACLE)
+    GOAL_CODE     = ord(GOAL)
+    
     """
     tuple[int]          dieLocation = the (row,column) position of the die
     Die                 die         = the die object in the current puzzle
-    array[Cell][Cell]   grid        = the grid that holds cell info
+    sequence[int]       cells       = the grid, one character code per cell at
+                                      row*width + col (see getCell); a 
+                                      bytearray, or the mapped section of a
+                                      shared board file
+    int                 width       = the number of columns in the grid
+    int                 height      = the number of rows in the grid
+    tuple[int]          startLocation = where the die starts; unlike 
+                                      dieLocation this never changes
+    int                 parity      = (row + col + orientation parity) % 2 of
+                                      the start state; every state reachable 
+                                      from the start shares it (see Die.py)
+    
+    The compiled successor graph (see compile) is None until compile is called:
+    array[int]          successorOffsets = successors of packed state s are at
+                                           [offsets[s], offsets[s+1]) in the
+                                           two arrays below
+    array[int]          successorStates  = packed successor states
+    array[Direction]    successorMoves   = the move that leads to each successor
+    array[int]          predecessorTable = the state that rolls into packed 
+                                           state s in direction d is at
+                                           [s*4 + d], or NO_STATE
+    
+    array[int]          goalDistances    = cached by getGoalDistances, or None
+    array[int]          gridDistances    = cached by getGridDistances, or None
     
     If a Cell object is not simply a character, then see Cell.py.
     Otherwise, Cell.py doesn't exist yet and we are using string literals
     """
-    __slots__ = ("_dieLocation","_die","_grid","_goalLocation")
+    __slots__ = ("_dieLocation","_die","_cells","_goalLocation","_width",\
+                 "_height","_parity","_startLocation",\
+                 "_successorOffsets","_successorStates","_successorMoves",\
+                 "_predecessorTable","_goalDistances","_gridDistances")
     
     def __init__(self,boardFile):
         """
@@ -63,7 +109,7 @@ class Board(object):
         
         Preconditions:  The boardString must be a valid board file
         """
-        self._grid = list()
+        self._cells = bytearray()
         tmpGrid = list()        # Temporary grid, used for formatting
         f = open(boardFile,"r")
         for line in f:
@@ -72,7 +118,10 @@ class Board(object):
         row = 0
         col = -1
         for line in tmpGrid:
-            self._grid.append(line.split())
+            if (len(line.split()) > 0):
+                self._width = len(line.split())
+            self._cells.extend(\
+                bytearray("".join(line.split()).encode("ascii")))
             if Board.START in line.split():
                 col = line.split().index(Board.START)
                 self._dieLocation = (row,col)
@@ -80,9 +129,19 @@ class Board(object):
                 col = line.split().index(Board.GOAL)
                 self._goalLocation = (row,col)
             row = row + 1
-        if col < 0:
-            raise NoStartError("Board has no start location: "+filename)
+        if (not hasattr(self,"_dieLocation")):
+            raise NoStartError("Board has no start location: "+boardFile)
         self._die = Die()
+        self._startLocation = self._dieLocation
+        self._height = len(self._cells)//self._width
+        self._parity = (self._dieLocation[0]+self._dieLocation[1]+\
+                        ORIENTATION_PARITY[self._die.getOrientation()]) % 2
+        self._successorOffsets = None
+        self._successorStates = None
+        self._successorMoves = None
+        self._predecessorTable = None
+        self._goalDistances = None
+        self._gridDistances = None
 
     def __str__(self):
         """
@@ -91,17 +150,14 @@ class Board(object):
         Description: Return a formatted string representing the board
         """
         resultString = ""
-        rNum = 0
-        for row in self._grid:
-            cNum = 0
-            for elem in row:
+        for rNum in range(0,self._height):
+            for cNum in range(0,self._width):
                 if (rNum,cNum) == self._dieLocation:
                     resultString = resultString + "D" + " "
                 else:
-                    resultString = resultString + elem + " "
-                cNum = cNum + 1
+                    resultString = resultString + \
+                                   chr(self.getCell((rNum,cNum))) + " "
             resultString = resultString + "\n"
-            rNum = rNum + 1
         ###die info
         resultString = resultString + str(self._die) + "\n"
         
@@ -202,11 +258,600 @@ class Board(object):
     
     #treat public
     def getWidth(self):
-        return len(self._grid[0])#number of columns
+        return self._width#number of columns
     
     #treat public
     def getHeight(self):
-        return len(self._grid)#number of rows
+        return self._height#number of rows
+    
+    #treat public
+    def getStartLocation(self):
+        return self._startLocation
+    
+    #treat public
+    def getCell(self,location):
+        """
+        Function: (int,int) -> int
+        
+        Returns: the character code of the cell at the given location, as in
+        ord(Board.FREE)
+        """
+        return self._cells[location[0]*self._width+location[1]]
+    
+    #treat public
+    def isObstacle(self,location):
+        return self.getCell(location) == Board.OBSTACLE_CODE
+    
+    #treat public
+    def setObstacle(self,location,blocked):
+        """
+        Function: (int,int) X bool -> null
+        
+        Description: blocks or frees the cell at the given location.  The 
+        compiled successor graph and the cached distance tables no longer hold
+        after that, so they are dropped; call compile again if it is wanted.
+        
+        Preconditions: the location must be on the board, and must not be the
+        start, the goal or the die's current location
+        
+        Mutates: the grid, and the compiled and cached tables if the cell 
+        changed
+        """
+        (row,col) = location
+        if (row < 0 or row >= self._height or col < 0 or col >= self._width):
+            raise ValueError("Cell is not on the board: "+str(location))
+        if (location == self._startLocation or \
+                location == self._goalLocation or \
+                location == self._dieLocation):
+            raise ValueError("Cell can not be blocked: "+str(location))
+        if (self.isObstacle(location) == blocked):
+            return
+        if (blocked):
+            self._cells[row*self._width+col] = Board.OBSTACLE_CODE
+        else:
+            self._cells[row*self._width+col] = ord(Board.FREE)
+        self._successorOffsets = None
+        self._successorStates = None
+        self._successorMoves = None
+        self._predecessorTable = None
+        self._goalDistances = None
+        self._gridDistances = None
+    
+    #treat public
+    def toggleObstacle(self,location):
+        """
+        Function: (int,int) -> null
+        
+        Description: frees the cell at the given location if it is blocked, 
+        and blocks it otherwise
+        
+        See: setObstacle
+        """
+        self.setObstacle(location,not self.isObstacle(location))
+    
+    #treat public
+    def getStateCount(self):
+        """
+        Function: null -> int
+        
+        Description: finds the number of distinct packed states on this board.
+        Only the die orientations of the start state's parity are counted, 
+        which is half of them on every cell.
+        
+        Returns: the number of packed states; every packed state is below this
+        """
+        return self._height*self._width*ORIENTATIONS_PER_PARITY
+    
+    #treat public
+    def packState(self,location,orientation):
+        """
+        Function: (int,int) X int -> int
+        
+        See: Die.py for orientation indices
+        
+        Description: encodes a die location and orientation as one dense
+        integer, (row*width + col)*ORIENTATIONS_PER_PARITY + the index of the
+        orientation among those of its parity.  The result can be used as a 
+        hash key or as an index into a flat array of size getStateCount().
+        
+        Preconditions: the state must have the board's parity; it must be 
+        reachable from the start state by rolling, as long as obstacles allow
+        
+        Returns: the packed state
+        """
+        if ((location[0]+location[1]+ORIENTATION_PARITY[orientation]) % 2 != \
+                self._parity):
+            raise ValueError("Die state can never be reached from the start: "\
+                             +str(location)+" "+str(orientation))
+        return (location[0]*self._width+location[1])*ORIENTATIONS_PER_PARITY+\
+               PARITY_INDEX[orientation]
+    
+    #treat public
+    def unpackState(self,state):
+        """
+        Function: int -> ((int,int), int)
+        
+        Description: decodes a packed state made by packState
+        
+        Returns: a tuple, ((row,col), orientation)
+        """
+        (cell,index) = divmod(state,ORIENTATIONS_PER_PARITY)
+        (row,col) = divmod(cell,self._width)
+        orientationParity = (self._parity+row+col) % 2
+        return ((row,col),ORIENTATIONS_OF_PARITY[orientationParity][index])
+    
+    #treat private
+    def _rollDestination(self,location,orientation,direction):
+        """
+        Function: (int,int) X int X Direction -> (int,int)
+        
+        Description: finds where a die at the given location and orientation
+        would land if rolled in the given direction: it must stay on the 
+        board, not land on an obstacle, and not end with 6 on top.  Every move
+        check of the board uses these rules.  Does not look at or change the
+        board's own die.
+        
+        Returns: the new location, or None if the roll is not legal
+        """
+        newPos = Board._addTuples(location,Directions.toGridVector(direction))
+        ##check Out Of Bounds
+        if (newPos[0] >= self._height or newPos[0] < 0):
+            return None
+        elif (newPos[1] >= self._width or newPos[1] < 0):
+            return None
+        ##check for obstacle
+        if (Board.OBSTACLE_CODE == \
+                self._cells[newPos[0]*self._width+newPos[1]]):
+            return None
+        ##check if 6 would be facing upwards
+        if (TOP_FACE[ROLL_TABLE[orientation][direction]] == 6):
+            return None
+        return newPos
+    
+    #treat public
+    def compile(self):
+        """
+        Function: null -> null
+        
+        Description: builds the whole successor graph of this board once, so 
+        that getSuccessors is a slice read instead of redoing the bounds, 
+        obstacle and 6-on-top checks for every expanded node.  Successors are
+        listed in the same order as getValidMoves.  The reversed graph, for
+        getPredecessors, is filled in from the same rolls: every state has at
+        most one predecessor per direction.
+        
+        Mutates: the compiled successor graph of the board is replaced
+        """
+        offsets = array("I",[0])
+        states = array("I")
+        moves = array("B")
+        predecessors = array("I",[Board.NO_STATE])*\
+                       (self.getStateCount()*len(Directions.DIRECTIONS))
+        for state in range(0,self.getStateCount()):
+            (location,orientation) = self.unpackState(state)
+            if (self.getCell(location) != Board.OBSTACLE_CODE):
+                for direction in Directions.DIRECTIONS:
+                    newPos = self._rollDestination(location,orientation,\
+                                                   direction)
+                    if (newPos is not None):
+                        newOrientation = ROLL_TABLE[orientation][direction]
+                        newState = self.packState(newPos,newOrientation)
+                        states.append(newState)
+                        moves.append(direction)
+                        predecessors[newState*len(Directions.DIRECTIONS)+\
+                                     direction] = state
+            offsets.append(len(states))
+        ##offsets last: getSuccessors takes them as the sign that the whole
+        ##graph is there, so another thread never sees half of it
+        self._successorStates = states
+        self._successorMoves = moves
+        self._predecessorTable = predecessors
+        self._successorOffsets = offsets
+    
+    #treat public
+    def isCompiled(self):
+        return self._successorOffsets is not None
+    
+    #treat public
+    def getSuccessors(self,state):
+        """
+        Function: int -> (sequence<int>, sequence<Direction>)
+        
+        Description: finds the legal moves out of a packed state.  They are 
+        read from the compiled successor graph, or worked out on the spot if 
+        the board has not been compiled.
+        
+        Returns: a tuple, (packed successor states, moves leading to them)
+        """
+        if (self._successorOffsets is None):
+            (location,orientation) = self.unpackState(state)
+            states = list()
+            moves = list()
+            for direction in Directions.DIRECTIONS:
+                newPos = self._rollDestination(location,orientation,direction)
+                if (newPos is not None):
+                    newOrientation = ROLL_TABLE[orientation][direction]
+                    states.append(self.packState(newPos,newOrientation))
+                    moves.append(direction)
+            return (states,moves)
+        start = self._successorOffsets[state]
+        end = self._successorOffsets[state+1]
+        return (self._successorStates[start:end],self._successorMoves[start:end])
+    
+    #treat private
+    def _predecessorState(self,location,orientation,direction):
+        """
+        Function: (int,int) X int X Direction -> int
+        
+        Description: finds the state a die must have been in to arrive at the
+        given location and orientation by rolling in the given direction
+        
+        Returns: the packed previous state, or None if that roll is not legal
+        """
+        prevPos = Board._addTuples(location,\
+                        Directions.toGridVector(Directions.otherWay(direction)))
+        if (prevPos[0] >= self._height or prevPos[0] < 0):
+            return None
+        elif (prevPos[1] >= self._width or prevPos[1] < 0):
+            return None
+        if (Board.OBSTACLE_CODE == \
+                self._cells[prevPos[0]*self._width+prevPos[1]]):
+            return None
+        prevOrientation = ROLL_TABLE[orientation][Directions.otherWay(direction)]
+        if (self._rollDestination(prevPos,prevOrientation,direction) is None):
+            return None
+        return self.packState(prevPos,prevOrientation)
+    
+    #treat public
+    def getPredecessors(self,state):
+        """
+        Function: int -> (sequence<int>, sequence<Direction>)
+        
+        Description: finds the packed states that can roll into the given 
+        packed state in one legal move.  They are read from the compiled 
+        reversed graph, or worked out on the spot if the board has not been
+        compiled.
+        
+        Returns: a tuple, (packed previous states, moves that lead from each of
+        them to the given state)
+        """
+        states = list()
+        moves = list()
+        predecessors = self._predecessorTable
+        if (predecessors is None):
+            (location,orientation) = self.unpackState(state)
+            for direction in Directions.DIRECTIONS:
+                prev = self._predecessorState(location,orientation,direction)
+                if (prev is not None):
+                    states.append(prev)
+                    moves.append(direction)
+            return (states,moves)
+        base = state*len(Directions.DIRECTIONS)
+        for direction in Directions.DIRECTIONS:
+            prev = predecessors[base+direction]
+            if (prev != Board.NO_STATE):
+                states.append(prev)
+                moves.append(direction)
+        return (states,moves)
+    
+    #treat private
+    def _backwardDistances(self,seedStates):
+        """
+        Function: collection<int> X -> array[int]
+        
+        Description: breadth first search over reversed die rolls from all of
+        the given packed states at once
+        
+        Returns: an array holding, for every packed state, the fewest moves 
+        needed to reach any of the seed states, or UNREACHABLE
+        """
+        distances = array("I",[Board.UNREACHABLE])*self.getStateCount()
+        queue = deque()
+        for seed in seedStates:
+            distances[seed] = 0
+            queue.append(seed)
+        while (len(queue) > 0):
+            state = queue.popleft()
+            nextDistance = distances[state] + 1
+            for prev in self.getPredecessors(state)[0]:
+                if (distances[prev] == Board.UNREACHABLE):
+                    distances[prev] = nextDistance
+                    queue.append(prev)
+        return distances
+    
+    #treat private
+    def _withParity(self,parity):
+        """
+        Function: int -> Board
+        
+        Description: makes a board that shares this one's grid, but whose 
+        packed states are the die states of the given parity: those whose 
+        row + col + ORIENTATION_PARITY[orientation] is odd for parity 1, even
+        for parity 0.  Its successor graph and goal distances are its own, and
+        not computed yet.
+        
+        Returns: the board with the given parity
+        """
+        board = copy.copy(self)
+        board._parity = parity
+        board._successorOffsets = None
+        board._successorStates = None
+        board._successorMoves = None
+        board._predecessorTable = None
+        board._goalDistances = None
+        return board
+    
+    #treat public
+    def getGoalStates(self):
+        """
+        Function: null -> list<int>
+        
+        Description: finds every packed state that is a goal state; the die on
+        the goal location with 1 on top.  Half of those orientations have the
+        wrong parity to ever be reached, and are left out.  Since a quarter 
+        turn on the goal keeps 1 on top and flips parity, two always remain.
+        
+        Returns: the list of packed goal states
+        """
+        goals = list()
+        goalParity = (self._parity+self._goalLocation[0]+\
+                      self._goalLocation[1]) % 2
+        for orientation in ORIENTATIONS_OF_PARITY[goalParity]:
+            if (TOP_FACE[orientation] == 1):
+                goals.append(self.packState(self._goalLocation,orientation))
+        return goals
+    
+    #treat public
+    def getGoalDistances(self):
+        """
+        Function: null -> array[int]
+        
+        Description: finds the exact number of moves from every packed state
+        to the goal by searching backwards from the goal states once.  The 
+        table is cached, so only the first call on a board pays for it.
+        
+        Returns: an array indexed by packed state holding the fewest moves to
+        the goal, or UNREACHABLE if the goal can not be reached from there
+        """
+        if (self._goalDistances is None):
+            self._goalDistances = self._backwardDistances(self.getGoalStates())
+        return self._goalDistances
+    
+    #treat public
+    def getGridDistances(self):
+        """
+        Function: null -> array[int]
+        
+        Description: finds the number of steps from every cell to the goal 
+        cell when walking around obstacles, ignoring the die entirely.  This is
+        one breadth first search from the goal cell, and the table is cached.
+        
+        Returns: an array indexed by row*width + col holding the steps to the
+        goal, or UNREACHABLE for obstacles and walled off cells
+        """
+        if (self._gridDistances is None):
+            height = self._height
+            distances = array("I",[Board.UNREACHABLE])*(height*self._width)
+            goal = self._goalLocation
+            distances[goal[0]*self._width+goal[1]] = 0
+            queue = deque([goal])
+            while (len(queue) > 0):
+                location = queue.popleft()
+                nextDistance = distances[location[0]*self._width+location[1]]+1
+                for direction in Directions.DIRECTIONS:
+                    (r,c) = Board._addTuples(location,\
+                                             Directions.toGridVector(direction))
+                    if (r < 0 or r >= height or c < 0 or c >= self._width):
+                        continue
+                    if (self._cells[r*self._width+c] == Board.OBSTACLE_CODE):
+                        continue
+                    if (distances[r*self._width+c] == Board.UNREACHABLE):
+                        distances[r*self._width+c] = nextDistance
+                        queue.append((r,c))
+            self._gridDistances = distances
+        return self._gridDistances
+    
+    #treat public
+    def saveShared(self,filename,successors=True,goalDistances=False,\
+                   gridDistances=False):
+        """
+        Function: string X bool X bool X bool -> null
+        
+        Description: writes the grid to one file that attachShared can map 
+        into other processes without copying or rebuilding it, along with the
+        compiled successor graph and the goal and grid distance tables if 
+        they are asked for.  The board is compiled and the tables are 
+        computed first if they are asked for and not there yet.  Processes 
+        that attach a file without a table work it out themselves when they
+        need it.  The file uses the machine's own byte order, so it is only
+        meant for processes on the same machine.
+        
+        File layout, every section starting on a 4 byte boundary:
+            SHARED_MAGIC
+            int32 height, width, parity, start row, start col, goal row,
+                  goal col, sections (SHARED_SUCCESSORS, 
+                  SHARED_GOAL_DISTANCES and SHARED_GRID_DISTANCES bits),
+                  number of successor offsets, number of successors
+            height*width grid characters
+            if there: uint32 successor offsets, uint32 successor states,
+                      uint8 successor moves
+            if there: uint32 goal distances
+            if there: uint32 grid distances
+        """
+        sections = 0
+        tables = list()
+        offsetCount = 0
+        successorCount = 0
+        if (successors):
+            if (not self.isCompiled()):
+                self.compile()
+            sections = sections | Board.SHARED_SUCCESSORS
+            offsetCount = len(self._successorOffsets)
+            successorCount = len(self._successorStates)
+            tables.extend([array("I",self._successorOffsets),\
+                           array("I",self._successorStates),\
+                           array("B",self._successorMoves)])
+        if (goalDistances):
+            sections = sections | Board.SHARED_GOAL_DISTANCES
+            tables.append(array("I",self.getGoalDistances()))
+        if (gridDistances):
+            sections = sections | Board.SHARED_GRID_DISTANCES
+            tables.append(array("I",self.getGridDistances()))
+        header = array("i",[self._height,self._width,self._parity,\
+                            self._startLocation[0],self._startLocation[1],\
+                            self._goalLocation[0],self._goalLocation[1],\
+                            sections,offsetCount,successorCount])
+        f = open(filename,"wb")
+        try:
+            f.write(Board.SHARED_MAGIC)
+            header.tofile(f)
+            for section in [array("B",self._cells)]+tables:
+                section.tofile(f)
+                f.write(b"\0"*(-len(section)*section.itemsize % 4))
+        finally:
+            f.close()
+    
+    #treat private
+    @staticmethod
+    def _mappedSection(mapped,offset,entryType,entries):
+        """
+        Function: mmap X int X ctypes type X int -> (sequence, int)
+        
+        Returns: (the entries at offset in mapped, viewed in place, the offset
+        of the next 4 byte aligned section)
+        """
+        section = (entryType*entries).from_buffer(mapped,offset)
+        end = offset+ctypes.sizeof(section)
+        return (section,end+(-end % 4))
+    
+    #treat public
+    @staticmethod
+    def attachShared(filename):
+        """
+        Function: string -> Board
+        
+        Description: makes a board from a file written by saveShared, with the
+        die at the start.  The grid and whichever of the successor graph and
+        distance tables the file holds are read in place from a copy on write
+        memory map of the file, so every process that attaches the same file 
+        shares their pages, and none of them is copied or rebuilt.  The 
+        tables the file does not hold are worked out when they are needed.
+        
+        Returns: the board, compiled if the file holds the successor graph
+        """
+        f = open(filename,"rb")
+        try:
+            mapped = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+        finally:
+            f.close()
+        if (mapped[:len(Board.SHARED_MAGIC)] != Board.SHARED_MAGIC):
+            raise IOError("Not a shared board file: "+filename)
+        offset = len(Board.SHARED_MAGIC)
+        (header,offset) = Board._mappedSection(mapped,offset,ctypes.c_int32,10)
+        (height,width,parity,startRow,startCol,goalRow,goalCol,sections,\
+         offsetCount,successorCount) = list(header)
+        board = Board.__new__(Board)
+        ##bytes rather than characters, so cells read as codes on every Python
+        (board._cells,offset) = Board._mappedSection(mapped,offset,\
+                                                     ctypes.c_uint8,\
+                                                     height*width)
+        board._width = width
+        board._height = height
+        board._parity = parity
+        board._startLocation = (startRow,startCol)
+        board._goalLocation = (goalRow,goalCol)
+        board._dieLocation = board._startLocation
+        board._die = Die()
+        board._successorOffsets = None
+        board._successorStates = None
+        board._successorMoves = None
+        board._predecessorTable = None
+        board._goalDistances = None
+        board._gridDistances = None
+        if (sections & Board.SHARED_SUCCESSORS):
+            (offsets,offset) = \
+                Board._mappedSection(mapped,offset,ctypes.c_uint32,offsetCount)
+            (board._successorStates,offset) = \
+                Board._mappedSection(mapped,offset,ctypes.c_uint32,\
+                                     successorCount)
+            (board._successorMoves,offset) = \
+                Board._mappedSection(mapped,offset,ctypes.c_uint8,\
+                                     successorCount)
+            board._successorOffsets = offsets#published last, as in compile
+        if (sections & Board.SHARED_GOAL_DISTANCES):
+            (board._goalDistances,offset) = \
+                Board._mappedSection(mapped,offset,ctypes.c_uint32,\
+                                     board.getStateCount())
+        if (sections & Board.SHARED_GRID_DISTANCES):
+            (board._gridDistances,offset) = \
+                Board._mappedSection(mapped,offset,ctypes.c_uint32,\
+                                     height*width)
+        if (offset != len(mapped)):
+            raise IOError("Bad shared board file size in "+filename)
+        return board
+    
+    #treat public
+    def rollDie(self,location,orientation,direction):
+        """
+        Function: (int,int) X int X Direction -> ((int,int), int)
+        
+        See: Die.py for orientation indices
+        
+        Description: finds the state a die at the given location and 
+        orientation would be in after rolling in the given direction.  Like
+        the other queries taking a location and orientation, this only reads 
+        the grid, never the board's own die, so one board can be shared by 
+        several threads as long as none of them changes it.
+        
+        Returns: a tuple, ((new row, new col), new orientation), or None if 
+        the roll is not legal
+        """
+        newPos = self._rollDestination(location,orientation,direction)
+        if (newPos is None):
+            return None
+        return (newPos,ROLL_TABLE[orientation][direction])
+    
+    #treat public
+    def isValidMoveFrom(self,location,orientation,direction):
+        """
+        Function: (int,int) X int X Direction -> boolean
+        
+        Description: determines if a die at the given location and orientation
+        may roll in the given direction; see rollDie
+        
+        Returns: True if the die movement on the board is legal
+        """
+        return self._rollDestination(location,orientation,direction) is not None
+    
+    #treat public
+    def getValidMovesFrom(self,location,orientation):
+        """
+        Function: (int,int) X int -> array[Direction]
+        
+        Description: produces a list of all moves a die at the given location
+        and orientation may make; see rollDie
+        
+        Returns: a list of all valid moves, in the order NORTH, EAST, SOUTH, 
+        WEST
+        """
+        moves = list()
+        for direction in Directions.DIRECTIONS:
+            if (self._rollDestination(location,orientation,direction) \
+                    is not None):
+                moves.append(direction)
+        return moves
+    
+    #treat public
+    def isGoalAt(self,location,orientation):
+        """
+        Function: (int,int) X int -> boolean
+        
+        Description: finds if a die at the given location and orientation is 
+        in a goal state; see rollDie
+        
+        Returns: True if the location is the goal and the die has 1 on top
+        """
+        return location == self._goalLocation and TOP_FACE[orientation] == 1
     
     #treat public
     def isValidMoveInner(self, direction):
@@ -220,21 +865,8 @@ class Board(object):
         
         Returns: True if the die movement on the board is legal
         """
-        newPos = Board._addTuples(self._dieLocation,\
-                                  Directions.toGridVector(direction))
-        ##check Out Of Bounds
-        if (newPos[0] >= self.getHeight() or newPos[0] < 0):
-            return False
-        elif (newPos[1] >= self.getWidth() or newPos[1] < 0):
-            return False
-        ##check for obstacle
-        if (Board.OBSTACLE == self._grid[newPos[0]][newPos[1]]):
-            return False
-        ##check if 6 would be facing upwards
-        if (self._die.getWhatTopWouldBe(direction) == 6):
-            return False
-        ##If we got this far, we passed our invalidation tests
-        return True
+        return self.isValidMoveFrom(self._dieLocation,\
+                                    self._die.getOrientation(),direction)
     
     #treat public
     def isValidMove(self, direction, dieLoc, die):
@@ -245,18 +877,11 @@ class Board(object):
         
         Description: determines if the given move on an arbitrary die at a given
         arbitrary location is a legal move for the puzzle.
-        POST STATE OF ALL DATA EQUALS PRE STATE.
+        DOES NOT READ OR CHANGE THE BOARD'S OWN DIE; see rollDie.
         
         Returns: True if the die movement on the board is legal
         """
-        actualLoc = self._dieLocation
-        actualDie = self._die
-        self._dieLocation = dieLoc
-        self._die = die
-        result = self.isValidMoveInner(direction)
-        self._dieLocation = actualLoc
-        self._die = actualDie
-        return result
+        return self.isValidMoveFrom(dieLoc,die.getOrientation(),direction)
         
     #treat public
     def getValidMovesInner(self):
@@ -270,12 +895,8 @@ class Board(object):
         
         Returns: a list of all valid moves (NORTH, SOUTH, EAST, WEST)
         """
-        moves = list()
-        for dir in [Directions.NORTH,Directions.EAST,\
-                    Directions.SOUTH,Directions.WEST]:
-            if (self.isValidMoveInner(dir)):
-                moves.append(dir)
-        return moves
+        return self.getValidMovesFrom(self._dieLocation,\
+                                      self._die.getOrientation())
     
     #treat public
     def getValidMoves(self,dieLoc,die):
@@ -287,18 +908,11 @@ class Board(object):
         Description: produces a list of all valid movements that a given 
         arbitrary die can make at a given arbitrary location.
         
-        POST STATE OF ALL DATA EQUALS PRE STATE.
+        DOES NOT READ OR CHANGE THE BOARD'S OWN DIE; see rollDie.
         
         Returns: a list of all valid moves (NORTH, SOUTH, EAST, WEST)
         """
-        actualLoc = self._dieLocation
-        actualDie = self._die
-        self._dieLocation = dieLoc
-        self._die = die
-        result = self.getValidMovesInner()
-        self._dieLocation = actualLoc
-        self._die = actualDie
-        return result
+        return self.getValidMovesFrom(dieLoc,die.getOrientation())
         
     #treat public
     def moveDie(self,direction):
@@ -330,7 +944,7 @@ class Board(object):
         Description: moves the die, wherever it is on the board in the given
         direction by 1 grid unit, and also handles it's rotation.
         
-        DOES NOT CHANGE INPUT STATE, BUT RETURNS A NEW STATE; COPIES DIE OBJ
+        DOES NOT CHANGE INPUT STATE, BUT RETURNS A NEW STATE; MAKES A NEW DIE
         
         Preconditions: the direction of movement must be valid.  Precede this
         function call with board.isValidMove(dir) or otherwise know that it is
@@ -340,9 +954,7 @@ class Board(object):
         """
         newLocation = Board._addTuples(location,\
                                   Directions.toGridVector(direction))
-        # TODO: check change with location instead of _dieLocation
-        newDie = deepcopy(die)
-        newDie.rotate(direction)
+        newDie = die.rolled(direction)
         return (newLocation,newDie)
     
     #treat public
@@ -355,8 +967,8 @@ class Board(object):
         Returns: True if the die is in goal state:
                     Die has 1 on top and is on the G location
         """
-        tileValue = self._grid[self._dieLocation[0]][self._dieLocation[1]]
-        if (tileValue == Board.GOAL):
+        tileValue = self.getCell(self._dieLocation)
+        if (tileValue == Board.GOAL_CODE):
             return self._die.getTop() == 1
         else:
             return False
@@ -371,8 +983,8 @@ class Board(object):
         
         Returns: True if the location and die would result in a goal state.
         """
-        tileValue = self._grid[location[0]][location[1]]
-        if (tileValue == Board.GOAL):
+        tileValue = self.getCell(location)
+        if (tileValue == Board.GOAL_CODE):
             return die.getTop() == 1
         else:
             return False
@@ -451,6 +1063,188 @@ if __name__ == "__main__":
     dieLoc = (4,5)
     print b3.isGoal(dieLoc, d) == True
 
+    # Packed state test
+    print b3.getStateCount() == 5*6*12
+    state = b3.packState((4,5), ns[1].getOrientation())
+    print state == (4*6+5)*12 + PARITY_INDEX[ns[1].getOrientation()]
+    print b3.unpackState(state) == ((4,5), ns[1].getOrientation())
+    for s in range(0,b3.getStateCount()):
+        (loc,orientation) = b3.unpackState(s)
+        if (b3.packState(loc,orientation) != s):
+            print False
+    try:
+        b3.packState((4,4), ns[1].getOrientation())
+        print False
+    except ValueError:
+        print True
+    print len(b3.getGoalStates()) == 2
+
+    # Goal distance test
+    distances = b3.getGoalDistances()
+    print b3.getGoalDistances() is distances
+    for goal in b3.getGoalStates():
+        print distances[goal] == 0
+    print distances[b3.packState((4,4),Die().getOrientation())] == 3
+    print distances[b3.packState((0,0),Die().getOrientation())] == Board.UNREACHABLE
+    same = b3._withParity(b3._parity)
+    print same.getGoalDistances() is not distances
+    print list(same.getGoalDistances()) == list(distances)
+    other = b3._withParity(1-b3._parity)
+    print other.packState((4,4),ROLL_TABLE[0][Directions.EAST]) >= 0
+    print b3._goalDistances is distances
+
+    # Predecessor test
+    for dieLoc in [(0,0),(2,2),(3,5),(4,4)]:
+        state = b3.packState(dieLoc,0)
+        (prevStates,prevMoves) = b3.getPredecessors(state)
+        print len(prevStates) > 0
+        for i in range(0,len(prevStates)):
+            (loc,orientation) = b3.unpackState(prevStates[i])
+            (newLoc,newDie) = b3.nextState(prevMoves[i],loc,Die(orientation))
+            print b3.packState(newLoc,newDie.getOrientation()) == state
+
+    # Grid distance test
+    gridDistances = b3.getGridDistances()
+    print gridDistances[4*6+5] == 0
+    print gridDistances[0] == 9
+    print gridDistances[2*6+2] == 5
+    print gridDistances[1*6+1] == Board.UNREACHABLE
+
+    # Compiled successor graph test
+    print b3.isCompiled() == False
+    uncompiled = [b3.getSuccessors(state) for state in range(0,b3.getStateCount())]
+    uncompiledPredecessors = [b3.getPredecessors(state) \
+                              for state in range(0,b3.getStateCount())]
+    b3.compile()
+    print all([b3.getPredecessors(state) == uncompiledPredecessors[state] \
+               for state in range(0,b3.getStateCount())])
+    sameSuccessors = True
+    for state in range(0,b3.getStateCount()):
+        (loc,orientation) = b3.unpackState(state)
+        if (not b3.isObstacle(loc)):
+            (states,moves) = b3.getSuccessors(state)
+            sameSuccessors = sameSuccessors and \
+                             list(states) == list(uncompiled[state][0]) and \
+                             list(moves) == list(uncompiled[state][1])
+    print sameSuccessors
+    print b3.isCompiled() == True
+    d = Die()
+    for dieLoc in [(0,0),(2,2),(3,5),(4,4)]:
+        (states,moves) = b3.getSuccessors(b3.packState(dieLoc,0))
+        print list(moves) == b3.getValidMoves(dieLoc,d)
+        for i in range(0,len(moves)):
+            (loc,newDie) = b3.nextState(moves[i],dieLoc,d)
+            print states[i] == b3.packState(loc,newDie.getOrientation())
+
+
+    # Obstacle toggling test
+    def rollsEastFrom(board,cell):
+        for state in range(cell*ORIENTATIONS_PER_PARITY,\
+                           (cell+1)*ORIENTATIONS_PER_PARITY):
+            if (Directions.EAST in list(board.getSuccessors(state)[1])):
+                return True
+        return False
+    print rollsEastFrom(b3,4*6+3)
+    b3.setObstacle((4,4),True)#the goal is then only reached from the north
+    print b3.isCompiled() == False
+    print b3.isObstacle((4,4))
+    print b3.getGridDistances()[4*6+2] == 5
+    print not rollsEastFrom(b3,4*6+3)
+    b3.toggleObstacle((4,4))
+    print b3.isObstacle((4,4)) == False
+    print b3.getGridDistances()[4*6+2] == 3
+    print rollsEastFrom(b3,4*6+3)
+    for cell in [(0,0),(4,5),(-1,0),(0,6)]:
+        try:
+            b3.setObstacle(cell,True)
+            print False
+        except ValueError:
+            print True
+    
+    # Shared board test
+    import os
+    import tempfile
+    b5 = Board("puzzles/puzzle5.txt")
+    (handle,sharedFile) = tempfile.mkstemp()
+    os.close(handle)
+    b5.saveShared(sharedFile)
+    shared = Board.attachShared(sharedFile)
+    print shared.isCompiled()
+    print shared._goalDistances is None and shared._gridDistances is None
+    print str(shared) == str(b5)
+    print shared.getCell((11,0)) == Board.GOAL_CODE
+    print shared.getStartLocation() == b5.getStartLocation()
+    print shared.getGoalStates() == b5.getGoalStates()
+    print all([list(shared.getSuccessors(state)[0]) == \
+               list(b5.getSuccessors(state)[0]) and \
+               list(shared.getSuccessors(state)[1]) == \
+               list(b5.getSuccessors(state)[1]) \
+               for state in range(0,b5.getStateCount())])
+    print list(shared.getGoalDistances()) == list(b5.getGoalDistances())
+    print list(shared.getGridDistances()) == list(b5.getGridDistances())
+    b5.saveShared(sharedFile,successors=False,goalDistances=True,\
+                  gridDistances=True)
+    shared = Board.attachShared(sharedFile)
+    print not shared.isCompiled()
+    print shared._goalDistances is not None
+    print list(shared.getGoalDistances()) == list(b5.getGoalDistances())
+    print list(shared.getGridDistances()) == list(b5.getGridDistances())
+    print list(shared.getSuccessors(5)[1]) == list(b5.getSuccessors(5)[1])
+    shared.setObstacle((5,5),True)#changes the copy only, not the file
+    print shared._goalDistances is None
+    print Board.attachShared(sharedFile).isObstacle((5,5)) == False
+    os.remove(sharedFile)
+    
+    # Non-mutating query test
+    b5 = Board("puzzles/puzzle5.txt")
+    b5.compile()
+    agrees = True
+    for state in range(0,b5.getStateCount()):
+        (location,orientation) = b5.unpackState(state)
+        if (b5.isObstacle(location)):
+            continue
+        (states,moves) = b5.getSuccessors(state)
+        agrees = agrees and list(moves) == \
+                 b5.getValidMovesFrom(location,orientation)
+        for i in range(0,len(states)):
+            agrees = agrees and b5.unpackState(states[i]) == \
+                     b5.rollDie(location,orientation,moves[i])
+    print agrees
+    print b5.rollDie((0,11),0,Directions.NORTH) is None
+    print b5.isGoalAt((11,0),0)
+    print not b5.isGoalAt((11,0),b5.rollDie((11,1),0,Directions.WEST)[1])
+    
+    # Shared board test: threads asking about other dice must neither see nor
+    # disturb each other
+    import threading
+    import random
+    expected = dict()
+    for state in range(0,b5.getStateCount()):
+        (location,orientation) = b5.unpackState(state)
+        if (not b5.isObstacle(location)):
+            expected[state] = list(b5.getSuccessors(state)[1])
+    queries = list(expected.keys())
+    failures = list()
+    def askRandomly(seed):
+        generator = random.Random(seed)
+        for i in range(0,20000):
+            state = generator.choice(queries)
+            (location,orientation) = b5.unpackState(state)
+            die = Die(orientation)
+            if (b5.getValidMoves(location,die) != expected[state]):
+                failures.append(state)
+            for direction in Directions.DIRECTIONS:
+                if (b5.isValidMove(direction,location,die) != \
+                        (direction in expected[state])):
+                    failures.append(state)
+    threads = [threading.Thread(target=askRandomly,args=(seed,)) \
+               for seed in range(0,4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print len(failures) == 0
+    print b5._dieLocation == b5.getStartLocation() and b5._die == Die()
     
     print ("This concludes tests for Board.py")
     
@@ -15,7 +15,16 @@ Dates editted:
 from Search import AStarSearchNode
 from Directions import *
 from Search import aStarSearch
+from Search import bidirectionalAStarSearch
+from Search import iterativeDeepeningAStarSearch
+from Search import frontierAStarSearch
+from Search import anytimeRepairingAStarSearch
+from Search import beamSearch, memoryBoundedAStarSearch
+from Search import ALWAYS_REPLACE, KEEP_SHALLOWEST
+from Search import INFINITY
 from Die import Die
+from Board import Board
+from DieDistanceTable import openPlaneDistance
 
 class Counter(object):
     __slots__ = ("count")
@@ -31,42 +40,59 @@ class BoardNode(AStarSearchNode):
     Provides search state for the board puzzle
     
     Caution: make sure this object and it's components are treated as constants;
-                do not change them, except for this.path and this.board
+                do not change them, except for this.board
     """
     
     """Treat these as public and use them in the heuristic functions
     Board       board       = the board object that corresponds to this state
     (int,int)   location    = the (row, column) tuple of the die location
     Die         die         = the die object that corresponds to die state.
-    tuple(Direction) path   = the moves taken from initial state to get here
+    BoardNode   parent      = the node this one was generated from, or None for
+                              the initial state
+    Direction   direction   = the move taken from parent to get here, or None
+    int         g           = the number of moves taken from initial state
+    int         state       = the location and die packed into one integer by
+                              board.packState; this is what identifies the node
     """
-    __slots__ = ("board","location","die","path","closedCounter","frontierCounter")
+    __slots__ = ("board","location","die","parent","direction","g",\
+                 "closedCounter","frontierCounter","state")
     
-    def __init__(self,board,location,die,closedCounter,frontierCounter,path):
+    def __init__(self,board,location,die,closedCounter,frontierCounter,\
+                 parent=None,direction=None,state=None):
         """
         Function: Board -> null
         
         Description: All Board Nodes will share the same board object, but 
-        different locations and dice.
+        different locations and dice.  Nodes only point to their parent, so the
+        path is rebuilt by getPath when it is needed.  The packed state is 
+        computed from location and die unless it is already known.
         """
         super(BoardNode,self).__init__()
         self.board = board
         self.location = location
         self.die = die
-        self.path = path
+        self.parent = parent
+        self.direction = direction
+        if (parent is None):
+            self.g = 0
+        else:
+            self.g = parent.g + 1
         self.closedCounter = closedCounter
         self.frontierCounter = frontierCounter
+        if (state is None):
+            state = board.packState(location,die.getOrientation())
+        self.state = state
     
     def __str__(self):
         result = "NODE:\n"
         result += "Location: "+str(self.location)+"\n"
         result += "Die:      "+str(self.die.getTop())+"\n"
-        result += "  UD:"+str(self.die._upDown)+"\n"
-        result += "  NS:"+str(self.die._northSouth)+"\n"
-        result += "  EW:"+str(self.die._eastWest)+"\n"
+        result += "  UD:"+str((self.die.getTop(),self.die.getBottom()))+"\n"
+        result += "  NS:"+str((self.die.getNorth(),self.die.getSouth()))+"\n"
+        result += "  EW:"+str((self.die.getEast(),self.die.getWest()))+"\n"
         result += "Hash:     "+str(hash(self))+"\n"
         result += "Dir: "
-        for dir in self.path:
+        for dir in self.getPath():
             result += "-"+Directions.directionToString(dir)
         result += "\n"
         return result
@@ -76,15 +102,24 @@ class BoardNode(AStarSearchNode):
         Function: null -> collection<BoardNode>
         
         Description: retrieves a list of successor BoardNodes for this board
-        node
+        node.  Uses the board's compiled successor graph if there is one.
         
         Returns: the list as described
         """
         result = list()
+        board = self.board
+        if (board.isCompiled()):
+            (states,moves) = board.getSuccessors(self.state)
+            for i in range(0,len(states)):
+                (location,orientation) = board.unpackState(states[i])
+                newNode = BoardNode(board,location,Die(orientation),\
+                                    self.closedCounter,self.frontierCounter,\
+                                    self,moves[i],states[i])
+                result.append(newNode)
+            return result
         for direction in self.board.getValidMoves(self.location,self.die):
             newState = self.board.nextState(direction,self.location,self.die)
-            newPath = self.path + (direction,)
-            newNode = BoardNode(self.board,newState[0],newState[1],self.closedCounter,self.frontierCounter,newPath)
+            newNode = BoardNode(self.board,newState[0],newState[1],self.closedCounter,self.frontierCounter,self,direction)
             result.append(newNode)
         return result
     
@@ -103,12 +138,18 @@ class BoardNode(AStarSearchNode):
         """
         Function: null -> sequence<Direction>
         
-        Description: retrieves the path from the start position that brought us
-        to this current location and orientation
+        Description: rebuilds the path from the start position that brought us
+        to this current location and orientation by following parent nodes
         
         Returns: the path that brought us to this current location
         """
-        return self.path
+        path = list()
+        node = self
+        while (node.parent is not None):
+            path.append(node.direction)
+            node = node.parent
+        path.reverse()
+        return tuple(path)
     
     def evaluatePath(self):
         """
@@ -119,7 +160,19 @@ class BoardNode(AStarSearchNode):
         
         Returns: the number of movements (cost) to get to this world state
         """
-        return len(self.path)
+        return self.g
+    
+    def getStateIndex(self):
+        return self.state
+    def getStateCount(self):
+        return self.board.getStateCount()
+    
+    def getOperator(self):
+        return self.direction
+    def reverseOperator(self,operator):
+        return Directions.otherWay(operator)
+    def forgetParent(self):
+        self.parent = None
     
     def notifyClosing(self):
         self.closedCounter.countUp()
@@ -127,16 +180,85 @@ class BoardNode(AStarSearchNode):
         self.frontierCounter.countUp()
     
     #allow use with == operator and use in sets or hashmaps
+    #both only look at the packed state, so they are plain int operations
     def __eq__(self,other):
-        diceEqual = (self.die == other.die)
-        locationsEqual = (self.location == other.location)
-        return (diceEqual and locationsEqual)
+        return self.state == other.state
     def __ne__(self,other):
-        return not self.__eq__(other)
+        return self.state != other.state
     def __hash__(self):
-        dieHash = self.die.__hash__()
-        return hash((dieHash, self.location))
+        return self.state
+
 
+class ReverseBoardNode(BoardNode):
+    """
+    A BoardNode for searching backwards from the goal.  Its successors are the
+    states that can roll into it, its parent is the state it rolls into next,
+    and direction is the move that takes it to its parent.  Its path is the 
+    list of moves from it to the goal.
+    """
+    
+    def successorStates(self):
+        """
+        Function: null -> collection<ReverseBoardNode>
+        
+        Description: retrieves a list of the nodes that can reach this one in
+        a single move
+        
+        Returns: the list as described
+        """
+        result = list()
+        board = self.board
+        (states,moves) = board.getPredecessors(self.state)
+        for i in range(0,len(states)):
+            (location,orientation) = board.unpackState(states[i])
+            newNode = ReverseBoardNode(board,location,Die(orientation),\
+                                       self.closedCounter,self.frontierCounter,\
+                                       self,moves[i],states[i])
+            result.append(newNode)
+        return result
+    
+    def isGoal(self):
+        """
+        Function: null -> boolean
+        
+        Returns: True if this node is the board's start state, which is the 
+        goal of a backward search
+        """
+        return self.location == self.board.getStartLocation() and \
+               self.die == Die()
+    
+    def getPath(self):
+        """
+        Function: null -> sequence<Direction>
+        
+        Description: rebuilds the path from this node to the goal by following
+        parent nodes
+        
+        Returns: the moves that take this node to the goal
+        """
+        path = list()
+        node = self
+        while (node.parent is not None):
+            path.append(node.direction)
+            node = node.parent
+        return tuple(path)
+
+def goalBoardNodes(board,closedCounter,frontierCounter):
+    """
+    Function: Board X Counter X Counter -> list<ReverseBoardNode>
+    
+    Description: makes a node for every reachable goal state of the board, to
+    start a backward search from
+    
+    Returns: the list of goal nodes
+    """
+    result = list()
+    for state in board.getGoalStates():
+        (location,orientation) = board.unpackState(state)
+        result.append(ReverseBoardNode(board,location,Die(orientation),\
+                                       closedCounter,frontierCounter,\
+                                       None,None,state))
+    return result
 
 ################################################################################
 ##Friendly evaluation functions for BoardNode objects
@@ -219,12 +341,67 @@ def ManhattanDistanceAccountingOrientation(boardNode):
             return (abs(dr)+abs(dc)+2)
     raise Exception("This line of code should be unreachable")
 
+def OpenPlaneDieDistance(boardNode):
+    """
+    The exact number of moves to the goal if the board had no obstacles and 
+    no edges, read from the shipped open plane table (see DieDistanceTable.py)
+    """
+    return openPlaneDistance(boardNode.location[0]-boardNode.board._goalLocation[0],\
+                             boardNode.location[1]-boardNode.board._goalLocation[1],\
+                             boardNode.die.getOrientation())
+
+def MazeDistanceIgnoringOrientation(boardNode):
+    """
+    The number of steps to the goal walking around obstacles, read from the 
+    board's grid distance table (see Board.getGridDistances).  Cells walled 
+    off from the goal are dead ends.
+    """
+    location = boardNode.location
+    distance = boardNode.board.getGridDistances()\
+                   [location[0]*boardNode.board.getWidth()+location[1]]
+    if (distance == Board.UNREACHABLE):
+        return INFINITY
+    return distance
+
+def MazeDistanceAccountingOrientation(boardNode):
+    """
+    The better of MazeDistanceIgnoringOrientation, which knows about obstacles,
+    and OpenPlaneDieDistance, which knows about the die.  Both are admissible
+    and consistent, so their maximum is as well.
+    """
+    return max(MazeDistanceIgnoringOrientation(boardNode),\
+               OpenPlaneDieDistance(boardNode))
+
+def ReverseOpenPlaneDieDistance(boardNode):
+    """
+    For backward searches: a lower bound on the moves from the board's start
+    state to this node.  Rolls can be undone, so that is at least the open 
+    plane distance from this node back to the start cell with 1 on top, which
+    is how every board's die starts.
+    """
+    start = boardNode.board.getStartLocation()
+    return openPlaneDistance(boardNode.location[0]-start[0],\
+                             boardNode.location[1]-start[1],\
+                             boardNode.die.getOrientation())
+
+def ExactGoalDistance(boardNode):
+    """
+    The true number of moves left, read from the board's goal distance table
+    (see Board.getGoalDistances).  A* only expands nodes on optimal paths with
+    it.  The table is built by the first call on each board.  States that can
+    not reach the goal are dead ends.
+    """
+    distance = boardNode.board.getGoalDistances()[boardNode.state]
+    if (distance == Board.UNREACHABLE):
+        return INFINITY
+    return distance
+
 ################################################################################
 
 #this is used by Main.py as the list of heuristics for it to use
 SequenceOfHeuristics = (UniformCost,\
                         ManhattanDistanceIgnoringOrientation,\
-                        ManhattanDistanceAccountingOrientation)
+                        OpenPlaneDieDistance)
 
 ################################################################################
 if __name__ == "__main__":
@@ -254,5 +431,125 @@ if __name__ == "__main__":
     print (ManhattanDistanceAccountingOrientation(bNode)==2)
     bNode.die.rotate(S)
     bNode.location = (3,5)
+    print (OpenPlaneDieDistance(bNode) >= \
+           ManhattanDistanceIgnoringOrientation(bNode))
+    bNode.die = Die()
+    bNode.location = (3,4)
+    print (OpenPlaneDieDistance(bNode) == 0)
+    bNode.location = (3,8)#1 is on top, so it needs to roll back and forth
+    print (OpenPlaneDieDistance(bNode) == 6)
+    
+    ##bidirectional search must find paths as short as A*
+    for puzzle in ["puzzles/puzzle2.txt","puzzles/puzzle3.txt",\
+                   "puzzles/puzzle5.txt"]:
+        board = Board(puzzle)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        path = aStarSearch(OpenPlaneDieDistance,startNode)
+        counter = Counter()
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              counter,counter)
+        biPath = bidirectionalAStarSearch(OpenPlaneDieDistance,\
+                                          ReverseOpenPlaneDieDistance,\
+                                          startNode,\
+                                          goalBoardNodes(board,counter,counter))
+        if (path is None):
+            print (biPath is None)
+        else:
+            print (len(biPath) == len(path))
+            for direction in biPath:
+                print (board.isValidMoveInner(direction))
+                board.moveDie(direction)
+            print (board.isGoalInner())
+    
+    ##so must IDA*, with or without a transposition table.  Without enough
+    ##slots to hold every state it cannot prove a board unsolvable quickly
+    for (puzzle,tableSize,policy) in \
+            [("puzzles/puzzle2.txt",0,KEEP_SHALLOWEST),\
+             ("puzzles/puzzle5.txt",16,ALWAYS_REPLACE),\
+             ("puzzles/puzzle5.txt",16,KEEP_SHALLOWEST),\
+             ("puzzles/puzzle3.txt",4096,KEEP_SHALLOWEST),\
+             ("puzzles/puzzle5.txt",4096,KEEP_SHALLOWEST)]:
+        board = Board(puzzle)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        path = aStarSearch(OpenPlaneDieDistance,startNode)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        idaPath = iterativeDeepeningAStarSearch(OpenPlaneDieDistance,\
+                                                startNode,tableSize,policy)
+        if (path is None):
+            print (idaPath is None)
+        else:
+            print (len(idaPath) == len(path))
+            for direction in idaPath:
+                print (board.isValidMoveInner(direction))
+                board.moveDie(direction)
+            print (board.isGoalInner())
+    
+    ##and frontier A*, which rebuilds its path from relay nodes
+    for puzzle in ["puzzles/puzzle1.txt","puzzles/puzzle2.txt",\
+                   "puzzles/puzzle3.txt","puzzles/puzzle5.txt"]:
+        for heuristicFunction in (UniformCost,OpenPlaneDieDistance):
+            board = Board(puzzle)
+            startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                  Counter(),Counter())
+            path = aStarSearch(heuristicFunction,startNode)
+            startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                  Counter(),Counter())
+            frontierPath = frontierAStarSearch(heuristicFunction,startNode)
+            if (path is None):
+                print (frontierPath is None)
+            else:
+                print (len(frontierPath) == len(path))
+                for direction in frontierPath:
+                    print (board.isValidMoveInner(direction))
+                    board.moveDie(direction)
+                print (board.isGoalInner())
+    
+    ##anytime A* paths must be within their bounds, and the last one optimal
+    for puzzle in ["puzzles/puzzle2.txt","puzzles/puzzle3.txt",\
+                   "puzzles/puzzle4.txt","puzzles/puzzle5.txt"]:
+        board = Board(puzzle)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        path = aStarSearch(OpenPlaneDieDistance,startNode)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        results = list(anytimeRepairingAStarSearch(OpenPlaneDieDistance,\
+                                                   startNode,5.0,1.0))
+        if (path is None):
+            print (len(results) == 0)
+        else:
+            for (anytimePath,bound) in results:
+                print (len(anytimePath) <= bound*len(path))
+            print (results[-1][1] == 1.0)
+            print (len(results[-1][0]) == len(path))
+            for direction in results[-1][0]:
+                print (board.isValidMoveInner(direction))
+                board.moveDie(direction)
+            print (board.isGoalInner())
+    
+    ##SMA* must find optimal paths even when it has to forget nodes, and beam
+    ##search valid ones
+    for puzzle in ["puzzles/puzzle2.txt","puzzles/puzzle4.txt",\
+                   "puzzles/puzzle5.txt"]:
+        board = Board(puzzle)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        path = aStarSearch(OpenPlaneDieDistance,startNode)
+        counter = Counter()
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              counter,counter)
+        smaPath = memoryBoundedAStarSearch(OpenPlaneDieDistance,startNode,\
+                                           len(path)+8)
+        print (len(smaPath) == len(path))
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        beamPath = beamSearch(OpenPlaneDieDistance,startNode,4)
+        for direction in beamPath:
+            print (board.isValidMoveInner(direction))
+            board.moveDie(direction)
+        print (board.isGoalInner())
     
     print ("This concludes tests for BoardNode.py")
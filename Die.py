@@ -31,18 +31,18 @@ class Die:
     
     
     """treat these as private varibles
-    tuple[int]  _upDown     = (top num  , bot num)
-    tuple[int]  _northSouth = (north num, south num)
-    tuple[int]  _eastWest   = (east num , west num)
+    int         _orientation = index of this die's orientation in the module
+                               orientation tables (see ROLL_TABLE below)
     """
-    __slots__ = ("_upDown","_northSouth","_eastWest")
+    __slots__ = ("_orientation",)
     
-    def __init__(self):
+    def __init__(self,orientation=0):
         """
-        Function: null -> null
+        Function: int -> null
         
         Description: Initializes a die; used in construction of a Die object
-        Initializes a Die object to the default, initial orientation:
+        Initializes a Die object to the given orientation index.  By default
+        this is the initial orientation:
         UP    = 1
         DOWN  = 6
         EAST  = 3
@@ -50,15 +50,10 @@ class Die:
         NORTH = 2
         SOUTH = 5
         """
-        self._upDown = Die._UP_DOWN
-        self._northSouth = Die._NORTH_SOUTH
-        self._eastWest = Die._EAST_WEST
+        self._orientation = orientation
     
     def __eq__(self,other):
-        x = self._upDown == other._upDown
-        y = self._northSouth == other._northSouth
-        z = self._eastWest == other._eastWest
-        return (x and y and z)
+        return self._orientation == other._orientation
     def __ne__(self,other):
         return not self.__eq__(other)
     def __hash__(self):
@@ -66,7 +61,7 @@ class Die:
         Assumes die state does not change.  Only use this where die objects
         are never altered
         """
-        return hash((self._upDown,self._northSouth,self._eastWest))
+        return self._orientation
     def __str__(self):
         return "TopFace: "+str(self.getTop())+"   NorthFace: "+\
                 str(self.getNorth())+"   EastFace: "+str(self.getEast())+"\n"+\
@@ -74,6 +69,9 @@ class Die:
                 str(self.getSouth())+"   WestFace: "+str(self.getWest())
         
     ############################################################################
+    ##The tuple manipulations below are only used to build the orientation 
+    ##tables once at import time.  A set of faces is a tuple in the form
+    ##((top,bot),(north,south),(east,west))
     
     #treat private
     @staticmethod
@@ -91,108 +89,74 @@ class Die:
         return result
     
     #treat private
-    def _rollNorthward(self):
+    @staticmethod
+    def _rolledFaces(faces,direction):
         """
-        Function: null -> null
-        
-        Description: changes the orientation of the cube as if it were rolled 
-        in the northward direction.  (rotated 90deg around East-West axis).
-        Top will now face Northward
+        Function: Faces X Direction -> Faces
         
-        DOES NOT CHANGE THE DIE POSITION, JUST ORIENTATION
+        Description: finds the faces of a die as if it were rolled in the given
+        direction.  Rolling northward or southward rotates the die around its 
+        East-West axis, rolling eastward or westward rotates it around its 
+        North-South axis.  The top will now face the given direction.
         
-        Mutates: the die will change as described
+        Returns: the set of faces after the roll
         """
-        ##Step 1: swap (top,bot) with (north,south)
-        tmp = self._upDown
-        self._upDown = self._northSouth
-        self._northSouth = tmp
-        ##Step 2: make sure the previous north is rolled underneath instead of up
-        self._upDown = Die._flippedTuple(self._upDown)
+        (upDown,northSouth,eastWest) = faces
+        if   (direction == Directions.NORTH):
+            ##swap (top,bot) with (north,south), previous north goes underneath
+            return (Die._flippedTuple(northSouth),upDown,eastWest)
+        elif (direction == Directions.SOUTH):
+            ##do the northward steps backwards
+            return (northSouth,Die._flippedTuple(upDown),eastWest)
+        elif (direction == Directions.EAST):
+            ##swap (top,bot) with (east,west), previous east goes underneath
+            return (Die._flippedTuple(eastWest),northSouth,upDown)
+        else:
+            ##do the eastward steps backwards
+            return (eastWest,northSouth,Die._flippedTuple(upDown))
     
-    #treat private
-    def _rollSouthward(self):
-        """
-        Function: null -> null
-        
-        Description: changes the orientation of the cube as if it were rolled 
-        in the southward direction.  (rotated -90deg around East-West axis).
-        Top will now face Southward
-        
-        DOES NOT CHANGE THE DIE POSITION, JUST ORIENTATION
-        
-        Mutates: the die will change as described
-        """
-        ##do _rollNorthward's steps backwards
-        self._upDown = Die._flippedTuple(self._upDown)
-        tmp = self._upDown
-        self._upDown = self._northSouth
-        self._northSouth = tmp
+    ############################################################################
     
-    #treat private
-    def _rollEastward(self):
+    #treat public
+    def rotate(self,direction):
         """
-        Function: null -> null
+        Function: Direction -> null
         
-        Description: changes the orientation of the cube as if it were rolled 
-        in the eastward direction.  (rotated 90deg around North-South axis).
-        Top will now face Eastward.
+        See: Directions.py
         
-        DOES NOT CHANGE THE DIE POSITION, JUST ORIENTATION
+        Description: Will rotate the cube towards the given direction such that
+        the top side will now face that direction (NORTH, SOUTH, EAST, or WEST)
         
         Mutates: the die will change as described
         """
-        ##Step 1: swap (top,bot) with (east,west)
-        tmp = self._upDown
-        self._upDown = self._eastWest
-        self._eastWest = tmp
-        ##Step 2: make sure the previous east is rolled underneath instead of up
-        self._upDown = Die._flippedTuple(self._upDown)
+        if (direction in Directions.DIRECTIONS):
+            self._orientation = ROLL_TABLE[self._orientation][direction]
+        else:
+            print ("Internal Error: invalid die rotation direction")
     
-    #treat private
-    def _rollWestward(self):
+    #treat public
+    def rolled(self,direction):
         """
-        Function: null -> null
-        
-        Description: changes the orientation of the cube as if it were rolled 
-        in the eastward direction.  (rotated 90deg around North-South axis).
-        Top will now face Eastward.
+        Function: Direction -> Die
         
-        DOES NOT CHANGE THE DIE POSITION, JUST ORIENTATION
+        Description: makes a new die that is this die rotated towards the given
+        direction.  This die does not change.
         
-        Mutates: the die will change as described
+        Returns: the rotated copy of this die
         """
-        ##do _rollEastward's steps backwards
-        self._upDown = Die._flippedTuple(self._upDown)
-        tmp = self._upDown
-        self._upDown = self._eastWest
-        self._eastWest = tmp
-        
-    
-    ############################################################################
+        return Die(ROLL_TABLE[self._orientation][direction])
     
     #treat public
-    def rotate(self,direction):
+    def getOrientation(self):
         """
-        Function: Direction -> null
-        
-        See: Directions.py
+        Function: null -> int
         
-        Description: Will rotate the cube towards the given direction such that
-        the top side will now face that direction (NORTH, SOUTH, EAST, or WEST)
+        Description: returns the index of this die's orientation, to be used 
+        with ROLL_TABLE, TOP_FACE, NORTH_FACE and EAST_FACE
         
-        Mutates: the die will change as described
+        Returns: the orientation index of this die
         """
-        if   (direction == Directions.NORTH):
-            self._rollNorthward()
-        elif (direction == Directions.SOUTH):
-            self._rollSouthward()
-        elif (direction == Directions.EAST):
-            self._rollEastward()
-        elif (direction == Directions.WEST):
-            self._rollWestward()
-        else:
-            print ("Internal Error: invalid die rotation direction")
+        return self._orientation
     
     #treat public
     def getTop(self):
@@ -204,7 +168,7 @@ class Die:
         
         Returns: the number on the top of this die
         """
-        return self._upDown[0]
+        return TOP_FACE[self._orientation]
         
     #treat public
     def getWhatTopWouldBe(self,direction):
@@ -214,39 +178,114 @@ class Die:
         See: Directions.py
         
         Description: return what the number on top of this dice will be if it 
-        were to be rotated in the given direction.
+        were to be rotated in the given direction.  This does not change the 
+        die.
         
         Returns: what the number on top would be if rotated in input direction
-        
-        Mutates: the pre-state and post-state of this die will be the same by
-        calling this function, but the intermediate state will be manipulated 
-        for computation.  This function effectively does not change state.
         """
-        self.rotate(direction)
-        val = self.getTop()
-        self.rotate(Directions.otherWay(direction))
-        return val
+        return TOP_FACE[ROLL_TABLE[self._orientation][direction]]
     
     #treat public
     def getNorth(self):
-        return self._northSouth[0]
+        return NORTH_FACE[self._orientation]
         
     #treat public
     def getEast(self):
-        return self._eastWest[0]
+        return EAST_FACE[self._orientation]
     
     #treat public
     def getBottom(self):
-        return self._upDown[1]
+        return 7 - TOP_FACE[self._orientation]
     
     #treat public
     def getSouth(self):
-        return self._northSouth[1]
+        return 7 - NORTH_FACE[self._orientation]
     
     #treat public
     def getWest(self):
-        return self._eastWest[1]
+        return 7 - EAST_FACE[self._orientation]
+
+################################################################################
+##Orientation tables
+##
+##A die has only 24 orientations.  They are numbered in the order they are 
+##discovered by rolling the initial die, so orientation 0 is the initial 
+##orientation.  These are built once at import and never change.
+def _buildOrientationTables():
+    """
+    Function: null -> (tuple[tuple[int]], tuple[int], tuple[int], tuple[int])
+    
+    Description: rolls the initial die in every direction until every 
+    orientation has been found, recording which orientation each roll leads to
     
+    Returns: (roll table, top faces, north faces, east faces)
+    """
+    initial = (Die._UP_DOWN,Die._NORTH_SOUTH,Die._EAST_WEST)
+    index = {initial:0}
+    found = [initial]
+    rolls = list()
+    cur = 0
+    while (cur < len(found)):
+        row = list()
+        for direction in Directions.DIRECTIONS:
+            faces = Die._rolledFaces(found[cur],direction)
+            if (not faces in index):
+                index[faces] = len(found)
+                found.append(faces)
+            row.append(index[faces])
+        rolls.append(tuple(row))
+        cur = cur + 1
+    top = tuple([faces[0][0] for faces in found])
+    north = tuple([faces[1][0] for faces in found])
+    east = tuple([faces[2][0] for faces in found])
+    return (tuple(rolls),top,north,east)
+
+##ROLL_TABLE[orientation][direction] = orientation after rolling in direction
+##TOP_FACE[orientation]              = number on the top face
+##NORTH_FACE[orientation]            = number on the north face
+##EAST_FACE[orientation]             = number on the east face
+(ROLL_TABLE,TOP_FACE,NORTH_FACE,EAST_FACE) = _buildOrientationTables()
+NUM_ORIENTATIONS = len(ROLL_TABLE)
+
+def _buildParityTables():
+    """
+    Function: null -> (tuple[int], tuple[int], tuple[tuple[int]])
+    
+    Description: every roll is a quarter turn, which is an odd permutation of
+    the die's faces, so each roll flips the parity of the die's orientation.
+    This finds the parity of every orientation (the number of rolls it takes to
+    reach it from the initial orientation, mod 2) and numbers the orientations
+    within each parity.
+    
+    Returns: (parity of each orientation, index of each orientation within
+    its parity, orientations of each parity)
+    """
+    parity = [None]*NUM_ORIENTATIONS
+    parity[0] = 0
+    queue = [0]
+    for orientation in queue:
+        for direction in Directions.DIRECTIONS:
+            rolled = ROLL_TABLE[orientation][direction]
+            if (parity[rolled] is None):
+                parity[rolled] = 1 - parity[orientation]
+                queue.append(rolled)
+    byParity = (list(),list())
+    for orientation in range(0,NUM_ORIENTATIONS):
+        byParity[parity[orientation]].append(orientation)
+    indexInParity = tuple([byParity[parity[orientation]].index(orientation) \
+                           for orientation in range(0,NUM_ORIENTATIONS)])
+    return (tuple(parity),indexInParity,\
+            (tuple(byParity[0]),tuple(byParity[1])))
+
+##A roll also moves the die to a cell of the other (row+col) parity, so 
+##(row + col + ORIENTATION_PARITY[orientation]) % 2 never changes, and only 
+##half of the orientations can ever be seen on a given cell.
+##ORIENTATION_PARITY[orientation]       = 0 or 1
+##PARITY_INDEX[orientation]             = index among orientations of the same
+##                                        parity
+##ORIENTATIONS_OF_PARITY[parity][index] = the orientation with that index
+(ORIENTATION_PARITY,PARITY_INDEX,ORIENTATIONS_OF_PARITY) = _buildParityTables()
+ORIENTATIONS_PER_PARITY = len(ORIENTATIONS_OF_PARITY[0])
 
 
 ################################################################################
@@ -360,5 +399,20 @@ if __name__ == "__main__":
     die.rotate(s)
     print (die.getTop() == 1)
     
+    
+    ##test orientation tables
+    print (NUM_ORIENTATIONS == 24)
+    print (die.getOrientation() == 0)
+    rolledDie = die.rolled(e)
+    print (die.getTop() == 1)
+    print (rolledDie.getTop() == 4)
+    print (rolledDie == Die(ROLL_TABLE[0][e]))
+    print (rolledDie.rolled(w) == die)
+    print (ORIENTATIONS_PER_PARITY == 12)
+    print (ORIENTATION_PARITY[rolledDie.getOrientation()] == 1)
+    print (ORIENTATION_PARITY[rolledDie.rolled(n).getOrientation()] == 0)
+    print (ORIENTATIONS_OF_PARITY[1][PARITY_INDEX[rolledDie.getOrientation()]] \
+           == rolledDie.getOrientation())
+    
 
     print ("This concludes tests for Die.py")
\ No newline at end of file
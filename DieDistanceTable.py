@@ -0,0 +1,180 @@
+"""
+DieDistanceTable.py
+
+Provides the open plane die distance table, a pattern database that does not
+depend on the board: the exact fewest number of rolls that bring a die from a
+given offset and orientation onto a goal cell with 1 on top, when there are no
+obstacles and no edges.  Since a board only ever takes moves away, this is an
+admissible and consistent heuristic for every board.
+
+The table is shipped as OpenPlaneDistances.bin and memory mapped when first
+used.  Use writeTable to regenerate it.
+
+Authors:
+    Joseph Fuchs        <jjf2614@rit.edu>
+    Damien Cremilleux   <dxc9849@rit.edu>
+"""
+
+import ctypes
+import mmap
+import os
+from collections import deque
+
+from Directions import *
+from Die import ROLL_TABLE, TOP_FACE, NUM_ORIENTATIONS
+
+##Static constants
+##exact distances are stored for every offset with |dr|,|dc| <= RADIUS
+RADIUS = 8
+##past RADIUS, rolling 4 more cells straight away from the goal costs exactly
+##4 more moves and leaves the die as it was, so farther offsets are folded 
+##back into the table in steps of 4 (this holds for any radius of 5 or more)
+PERIOD = 4
+##the search runs on a larger area so that paths which swing wide of the 
+##table are not cut off
+_SEARCH_RADIUS = 3*RADIUS
+_SIDE = 2*RADIUS+1
+TABLE_SIZE = _SIDE*_SIDE*NUM_ORIENTATIONS
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),\
+                          "OpenPlaneDistances.bin")
+
+_table = None#loaded on first use
+
+def _searchOpenPlane(radius):
+    """
+    Function: int -> dict<(int,int,int),int>
+    
+    Description: breadth first search over reversed die rolls from the goal 
+    states at (0,0), on an open square of cells with |dr|,|dc| <= radius
+    
+    Returns: a map from (dr, dc, orientation) to the fewest moves to the goal
+    """
+    distances = dict()
+    queue = deque()
+    for orientation in range(0,NUM_ORIENTATIONS):
+        if (TOP_FACE[orientation] == 1):
+            distances[(0,0,orientation)] = 0
+            queue.append((0,0,orientation))
+    while (len(queue) > 0):
+        (r,c,orientation) = queue.popleft()
+        if (TOP_FACE[orientation] == 6):#nothing can roll into this state
+            continue
+        nextDistance = distances[(r,c,orientation)] + 1
+        for direction in Directions.DIRECTIONS:
+            (dr,dc) = Directions.toGridVector(direction)
+            (pr,pc) = (r-dr,c-dc)
+            if (abs(pr) > radius or abs(pc) > radius):
+                continue
+            prev = (pr,pc,ROLL_TABLE[orientation][Directions.otherWay(direction)])
+            if (not prev in distances):
+                distances[prev] = nextDistance
+                queue.append(prev)
+    return distances
+
+def _tableIndex(dr,dc,orientation):
+    return ((dr+RADIUS)*_SIDE+(dc+RADIUS))*NUM_ORIENTATIONS+orientation
+
+def buildTable():
+    """
+    Function: null -> bytearray
+    
+    Description: computes the open plane distance table
+    
+    Returns: one byte per (dr, dc, orientation) with |dr|,|dc| <= RADIUS
+    """
+    distances = _searchOpenPlane(_SEARCH_RADIUS)
+    table = bytearray(TABLE_SIZE)
+    for dr in range(-RADIUS,RADIUS+1):
+        for dc in range(-RADIUS,RADIUS+1):
+            for orientation in range(0,NUM_ORIENTATIONS):
+                #a die with 6 on top can still roll, so every state is reached
+                table[_tableIndex(dr,dc,orientation)] = \
+                    distances[(dr,dc,orientation)]
+    return table
+
+def writeTable(filename=TABLE_FILE):
+    """
+    Function: string -> null
+    
+    Description: computes the table and writes it to the given file
+    """
+    f = open(filename,"wb")
+    try:
+        f.write(buildTable())
+    finally:
+        f.close()
+
+def loadTable(filename=TABLE_FILE):
+    """
+    Function: string -> sequence<int>
+    
+    Description: memory maps a table written by writeTable.  The mapping is
+    copy on write, so the pages are shared with every other process that maps
+    the same file.
+    
+    Returns: the table, indexable like a bytearray of ints
+    """
+    f = open(filename,"rb")
+    try:
+        mapped = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+    finally:
+        f.close()
+    if (len(mapped) != TABLE_SIZE):
+        raise IOError("Bad open plane distance table size in "+filename)
+    return (ctypes.c_uint8*TABLE_SIZE).from_buffer(mapped)
+
+def _foldOffset(d):
+    """
+    Function: int -> int
+    
+    Description: moves an offset past RADIUS back towards 0 by whole PERIODs
+    
+    Returns: the folded offset; |result| <= RADIUS
+    """
+    if (d > RADIUS):
+        return d - PERIOD*((d-RADIUS+PERIOD-1)//PERIOD)
+    elif (d < -RADIUS):
+        return d + PERIOD*((-d-RADIUS+PERIOD-1)//PERIOD)
+    return d
+
+def openPlaneDistance(dr,dc,orientation):
+    """
+    Function: int X int X int -> int
+    
+    Description: finds the fewest moves for a die with the given orientation
+    to reach a goal dr rows and dc columns away with 1 on top, with nothing in
+    the way
+    
+    Returns: the number of moves
+    """
+    global _table
+    if (_table is None):
+        _table = loadTable()
+    fr = _foldOffset(dr)
+    fc = _foldOffset(dc)
+    return _table[_tableIndex(fr,fc,orientation)] + abs(dr)-abs(fr) + \
+                                                     abs(dc)-abs(fc)
+
+
+################################################################################
+if __name__ == "__main__":
+    print ("Unit test for DieDistanceTable.py mechanics:  Should return no falses")
+    
+    print (list(loadTable()) == list(buildTable()))
+    
+    print (openPlaneDistance(0,0,0) == 0)
+    print (openPlaneDistance(0,1,0) > 1)#1 faces up, so a single roll won't do
+    
+    ##compare folded lookups against a plain search over a larger area
+    wide = 2*_SEARCH_RADIUS
+    distances = _searchOpenPlane(wide+RADIUS)
+    mismatches = 0
+    for dr in range(-wide,wide+1):
+        for dc in range(-wide,wide+1):
+            for orientation in range(0,NUM_ORIENTATIONS):
+                if (openPlaneDistance(dr,dc,orientation) != \
+                        distances[(dr,dc,orientation)]):
+                    mismatches = mismatches + 1
+    print (mismatches == 0)
+    
+    print ("This concludes tests for DieDistanceTable.py")
@@ -0,0 +1,222 @@
+"""
+DistanceMap.py
+
+Solves a board from every start at once: the board's breadth first search
+backwards from the goal, run once for each parity of its packed states, gives
+the fewest moves to the goal from every (cell, orientation) of the die, and
+the first move of a shortest path from there.
+
+Unlike the packed states of Board, the map covers all 24 orientations on every
+cell, so it also answers for starts whose parity differs from the board's own
+start.  Entry (row*width + col)*NUM_ORIENTATIONS + orientation is the state of
+a die with that orientation (see Die.py) at (row,col).
+
+The map is saved as two flat files that other programs can memory map:
+    <name>.dist     one little endian 32 bit unsigned int per entry, the
+                    fewest moves to the goal, or UNREACHABLE
+    <name>.policy   one byte per entry, the Direction to roll first, or
+                    NO_MOVE on the goal and where the goal can not be reached
+
+Authors:
+    Joseph Fuchs        <jjf2614@rit.edu>
+    Damien Cremilleux   <dxc9849@rit.edu>
+"""
+
+import ctypes
+import mmap
+import sys
+from array import array
+
+from Directions import *
+from Die import ROLL_TABLE, TOP_FACE, NUM_ORIENTATIONS
+
+##Static constants
+UNREACHABLE = 0xFFFFFFFF
+NO_MOVE = 0xFF
+DISTANCE_SUFFIX = ".dist"
+POLICY_SUFFIX = ".policy"
+
+def mapIndex(board,location,orientation):
+    """
+    Function: Board X (int,int) X int -> int
+
+    Returns: the entry of the map for a die with the given orientation at the
+    given location
+    """
+    return (location[0]*board.getWidth()+location[1])*NUM_ORIENTATIONS+\
+           orientation
+
+def buildDistanceMap(board):
+    """
+    Function: Board -> (array[int], array[int])
+
+    Description: takes the goal distances of the board's packed states, and
+    of those of a board with the other parity, from the board's own
+    backward breadth first search, over compiled copies of the board.  The
+    policy move of each state is the first of its legal moves, in the order 
+    of getSuccessors, that leads to a state one move closer to the goal.
+    Obstacles get no entries, and neither do states only reachable through 
+    them.
+
+    Returns: a tuple, (distances, policy), indexed by mapIndex
+    """
+    entries = board.getWidth()*board.getHeight()*NUM_ORIENTATIONS
+    distances = array("I",[UNREACHABLE])*entries
+    policy = array("B",[NO_MOVE])*entries
+    for parity in [0,1]:
+        view = board._withParity(parity)
+        view.compile()
+        goalDistances = view.getGoalDistances()
+        for state in range(0,view.getStateCount()):
+            distance = goalDistances[state]
+            if (distance == UNREACHABLE):
+                continue
+            (location,orientation) = view.unpackState(state)
+            index = mapIndex(board,location,orientation)
+            distances[index] = distance
+            if (distance == 0):
+                continue
+            (states,moves) = view.getSuccessors(state)
+            for i in range(0,len(states)):
+                if (goalDistances[states[i]] == distance-1):
+                    policy[index] = moves[i]
+                    break
+    return (distances,policy)
+
+def writeDistanceMap(board,name):
+    """
+    Function: Board X string -> (array[int], array[int])
+
+    Description: builds the map of the board and writes it to name+".dist"
+    and name+".policy"
+
+    Returns: the map, as buildDistanceMap
+    """
+    (distances,policy) = buildDistanceMap(board)
+    onDisk = array("I",distances)
+    if (sys.byteorder == "big"):
+        onDisk.byteswap()
+    f = open(name+DISTANCE_SUFFIX,"wb")
+    try:
+        onDisk.tofile(f)
+    finally:
+        f.close()
+    f = open(name+POLICY_SUFFIX,"wb")
+    try:
+        policy.tofile(f)
+    finally:
+        f.close()
+    return (distances,policy)
+
+def _mapFile(filename,entryType,entries):
+    f = open(filename,"rb")
+    try:
+        mapped = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+    finally:
+        f.close()
+    if (len(mapped) != ctypes.sizeof(entryType)*entries):
+        raise IOError("Bad distance map size in "+filename)
+    return (entryType*entries).from_buffer(mapped)
+
+def loadDistanceMap(board,name):
+    """
+    Function: Board X string -> (sequence<int>, sequence<int>)
+
+    Description: memory maps a distance map written by writeDistanceMap for
+    a board of the same size.  The mappings are copy on write, so the pages
+    are shared with every other process that maps the same files.
+
+    Returns: a tuple, (distances, policy), indexed by mapIndex
+    """
+    entries = board.getWidth()*board.getHeight()*NUM_ORIENTATIONS
+    if (sys.byteorder == "big"):
+        distanceType = ctypes.c_uint32.__ctype_le__
+    else:
+        distanceType = ctypes.c_uint32
+    return (_mapFile(name+DISTANCE_SUFFIX,distanceType,entries),\
+            _mapFile(name+POLICY_SUFFIX,ctypes.c_uint8,entries))
+
+def followPolicy(board,policy,location,orientation):
+    """
+    Function: Board X sequence<int> X (int,int) X int -> tuple<Direction>
+
+    Description: rolls a die from the given state along the policy moves
+    until it reaches the goal
+
+    Returns: the path, in the form of BoardNode.getPath, or None if the goal
+    can not be reached from the given state
+    """
+    path = list()
+    while (True):
+        move = policy[mapIndex(board,location,orientation)]
+        if (move == NO_MOVE):
+            break
+        path.append(move)
+        vector = Directions.toGridVector(move)
+        location = (location[0]+vector[0],location[1]+vector[1])
+        orientation = ROLL_TABLE[orientation][move]
+    if (location != board._goalLocation or TOP_FACE[orientation] != 1):
+        return None
+    return tuple(path)
+
+
+
+################################################################################
+if __name__ == "__main__":
+    print ("Unit test for DistanceMap.py:  Should return no falses")
+
+    import os
+    import shutil
+    import tempfile
+    from Board import Board
+
+    ##the map must agree with the board's own goal distances on the states of
+    ##the board's parity, and its policy must follow them down to the goal.
+    ##The same map must also hold for the board with its start moved by one
+    ##cell, whose states have the other parity.
+    workDirectory = tempfile.mkdtemp()
+    for puzzle in ["puzzles/puzzle1.txt","puzzles/puzzle2.txt",\
+                   "puzzles/puzzle3.txt","puzzles/puzzle4.txt",\
+                   "puzzles/puzzle5.txt"]:
+        board = Board(puzzle)
+        (distances,policy) = buildDistanceMap(board)
+        (row,col) = board.getStartLocation()
+        rows = [line.split() for line in open(puzzle) if line.strip()]
+        for (r,c) in [(row,col-1),(row,col+1),(row-1,col),(row+1,col)]:
+            if (0 <= r < len(rows) and 0 <= c < len(rows[0]) and \
+                    rows[r][c] == Board.FREE):
+                rows[row][col] = Board.FREE
+                rows[r][c] = Board.START
+                break
+        moved = os.path.join(workDirectory,"moved.txt")
+        f = open(moved,"w")
+        f.write("\n".join([" ".join(line) for line in rows])+"\n")
+        f.close()
+        for board in [board,Board(moved)]:
+            goalDistances = board.getGoalDistances()
+            mismatches = 0
+            for state in range(0,board.getStateCount()):
+                (location,orientation) = board.unpackState(state)
+                distance = distances[mapIndex(board,location,orientation)]
+                if (board.isObstacle(location)):
+                    distance = UNREACHABLE
+                if (distance != goalDistances[state]):
+                    mismatches = mismatches + 1
+                elif (distance != UNREACHABLE):
+                    path = followPolicy(board,policy,location,orientation)
+                    if (path is None or len(path) != distance):
+                        mismatches = mismatches + 1
+            print (mismatches == 0)
+    print (board.getStartLocation() != Board(puzzle).getStartLocation())
+
+    ##written maps must read back the same
+    name = os.path.join(workDirectory,"puzzle1")
+    (distances,policy) = writeDistanceMap(board,name)
+    (mappedDistances,mappedPolicy) = loadDistanceMap(board,name)
+    print (list(mappedDistances) == list(distances))
+    print (list(mappedPolicy) == list(policy))
+    print (os.path.getsize(name+DISTANCE_SUFFIX) == 4*len(distances))
+    del mappedDistances,mappedPolicy
+    shutil.rmtree(workDirectory)
+
+    print ("This concludes tests for DistanceMap.py")
@@ -0,0 +1,356 @@
+"""
+ExternalSearch.py
+
+Solves rolling-die puzzles whose search does not fit in memory with external
+memory A*.  The open and closed lists are files of packed states on disk, one
+file per (g, h) bucket, and duplicate states are removed by sorting each bucket
+and merging it against the buckets before it, instead of by hashing.
+
+Authors:
+    Joseph Fuchs        <jjf2614@rit.edu>
+    Damien Cremilleux   <dxc9849@rit.edu>
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+from array import array
+
+from Die import Die
+from BoardNode import BoardNode
+from Search import INFINITY
+
+##Static constants
+STATE_SIZE = array("I").itemsize#bytes per packed state on disk
+DEFAULT_MEMORY_BUDGET = 64*1024*1024#bytes
+
+class _BufferBudget(object):
+    """Minor Class
+    The number of states that a group of _StateWriters may hold in memory
+    together.  When an append puts the group over its limit, the writer with
+    the largest buffer is flushed, so the total never exceeds the limit no 
+    matter how many writers are open.
+    """
+    __slots__ = ("limit","total","writers")
+    def __init__(self,limit):
+        self.limit = limit
+        self.total = 0
+        self.writers = set()
+    def flushLargest(self):
+        max(self.writers,key=lambda writer: len(writer.buffer)).flush()
+
+class _StateWriter(object):
+    """Minor Class
+    Appends packed states to a file, buffering them in memory as long as the
+    budget it shares with other writers allows
+    """
+    __slots__ = ("path","buffer","_budget")
+    def __init__(self,path,budget):
+        self.path = path
+        self.buffer = array("I")
+        self._budget = budget
+        budget.writers.add(self)
+    def append(self,state):
+        self.buffer.append(state)
+        self._budget.total += 1
+        if (self._budget.total > self._budget.limit):
+            self._budget.flushLargest()
+    def flush(self):
+        with open(self.path,"ab") as stateFile:
+            self.buffer.tofile(stateFile)
+        self._budget.total -= len(self.buffer)
+        self.buffer = array("I")
+    def close(self):
+        """flushes the writer and takes it out of its budget"""
+        self.flush()
+        self._budget.writers.discard(self)
+
+def _readStates(path,bufferSize):
+    """
+    Function: string X int -> iterator<int>
+
+    Description: streams the packed states of a file, reading bufferSize of
+    them at a time (at least one)
+
+    Returns: a generator of the states, in file order
+    """
+    bufferSize = max(1,bufferSize)
+    with open(path,"rb") as stateFile:
+        while (True):
+            chunk = array("I")
+            try:
+                chunk.fromfile(stateFile,bufferSize)
+            except EOFError:#the states that were there are still read
+                for state in chunk:
+                    yield state
+                return
+            for state in chunk:
+                yield state
+
+def _contains(path,state):
+    """
+    Function: string X int -> bool
+
+    Description: binary search for a packed state in a sorted file, reading
+    one state per step
+
+    Returns: True iff the state is in the file
+    """
+    with open(path,"rb") as stateFile:
+        low = 0
+        high = os.path.getsize(path)//STATE_SIZE
+        while (low < high):
+            middle = (low+high)//2
+            stateFile.seek(middle*STATE_SIZE)
+            found = array("I")
+            found.fromfile(stateFile,1)
+            if (found[0] == state):
+                return True
+            elif (found[0] < state):
+                low = middle+1
+            else:
+                high = middle
+    return False
+
+def _sortUnique(path,sortedPath,subtractPaths,runSize,bufferSize):
+    """
+    Function: string X string X list<string> X int X int -> int
+
+    Description: external merge sort of the packed states in path.  Runs of at
+    most runSize states are sorted in memory and written next to path, then
+    all runs are merged into sortedPath.  Repeated states, and states found in
+    any of the sorted files of subtractPaths, are left out.  path and the runs
+    are deleted.  The merge holds about bufferSize states in memory in all, 
+    split between the files it reads and the one it writes.
+
+    Returns: the number of states written to sortedPath
+    """
+    runPaths = list()
+    for start in range(0,os.path.getsize(path)//STATE_SIZE,runSize):
+        with open(path,"rb") as stateFile:
+            stateFile.seek(start*STATE_SIZE)
+            run = array("I")
+            try:
+                run.fromfile(stateFile,runSize)
+            except EOFError:
+                pass
+        run = array("I",sorted(set(run)))
+        runPath = path+".run"+str(len(runPaths))
+        with open(runPath,"wb") as runFile:
+            run.tofile(runFile)
+        runPaths.append(runPath)
+    os.remove(path)
+
+    streamSize = bufferSize//(len(runPaths)+len(subtractPaths)+1)
+    merged = heapq.merge(*[_readStates(runPath,streamSize) \
+                           for runPath in runPaths])
+    subtract = heapq.merge(*[_readStates(subtractPath,streamSize) \
+                             for subtractPath in subtractPaths])
+    nextOld = next(subtract,None)
+    writer = _StateWriter(sortedPath,_BufferBudget(max(1,streamSize)))
+    last = None
+    count = 0
+    for state in merged:
+        if (state == last):
+            continue
+        last = state
+        while (nextOld is not None and nextOld < state):
+            nextOld = next(subtract,None)
+        if (nextOld == state):
+            continue
+        writer.append(state)
+        count += 1
+    writer.close()
+    for runPath in runPaths:
+        os.remove(runPath)
+    return count
+
+def _tracePath(board,heuristic,closed,goalState,goalDepth):
+    """
+    Function: Board X (Function: int -> int) X dict<(int,int),string> X int X
+              int -> tuple<Direction>
+
+    Description: walks back from the goal one layer at a time.  A predecessor
+    of a state on layer g is looked up in the closed bucket of layer g-1 that
+    its heuristic value puts it in.
+
+    Returns: the moves from the start state to the goal state
+    """
+    path = list()
+    state = goalState
+    for depth in range(goalDepth-1,-1,-1):
+        (states,moves) = board.getPredecessors(state)
+        for i in range(0,len(states)):
+            bucket = closed.get((depth,heuristic(states[i])))
+            if (bucket is not None and _contains(bucket,states[i])):
+                path.append(moves[i])
+                state = states[i]
+                break
+    path.reverse()
+    return tuple(path)
+
+def externalAStarSearch(heuristicFunction,boardNode,\
+                        memoryBudget=DEFAULT_MEMORY_BUDGET,directory=None):
+    """
+    Function: (Function: BoardNode -> int) X BoardNode -> tuple<Direction>
+
+    Description: finds the optimal path from boardNode to the goal with A*,
+    keeping its open and closed lists on disk.  States are put in (g, h)
+    buckets, and the buckets are expanded in order of f = g+h, then g.
+    Before a bucket is expanded it is sorted, and states already in the
+    buckets with the same h one or two layers back are removed; since h only
+    depends on the state and every move can be undone, those are the only
+    places an earlier copy can be.  The path is rebuilt at the end by looking
+    up predecessors in the sorted closed buckets.
+
+    memoryBudget is roughly the number of bytes of states held in memory at
+    once: a quarter for the write buffers of all open buckets together, and 
+    at most half for either sorting a run of a bucket, merging the runs, or
+    reading the bucket being expanded.  The bucket files are kept in a
+    new temporary folder under directory (or the system's default) that is
+    removed when the search ends.
+
+    Returns: the path to the goal, in the form of BoardNode.getPath, or None
+    if there is none
+
+    Preconditions: heuristicFunction must be consistent and admissible
+
+    Note: the node counters count every state closed, and every state written
+    to a bucket, duplicates included, since those are only found when the
+    bucket is sorted
+    """
+    board = boardNode.board
+    closedCounter = boardNode.closedCounter
+    frontierCounter = boardNode.frontierCounter
+    def heuristic(state):
+        (location,orientation) = board.unpackState(state)
+        return heuristicFunction(BoardNode(board,location,Die(orientation),\
+                                           closedCounter,frontierCounter,\
+                                           state=state))
+
+    stateBudget = max(1024,memoryBudget//STATE_SIZE)
+    runSize = stateBudget//2
+    bufferSize = stateBudget//4
+    writeBudget = _BufferBudget(stateBudget//4)#shared by every open bucket
+    goals = set(board.getGoalStates())
+    workDirectory = tempfile.mkdtemp(prefix="sdmaze",dir=directory)
+    def bucketPath(kind,key):
+        return os.path.join(workDirectory,kind+"_"+str(key[0])+"_"+str(key[1]))
+
+    try:
+        startHeuristic = heuristic(boardNode.state)
+        if (startHeuristic == INFINITY):
+            return None
+        opened = dict()#(g,h) -> _StateWriter of the bucket's unsorted states
+        closed = dict()#(g,h) -> path of the bucket's sorted states
+        opened[(0,startHeuristic)] = \
+            _StateWriter(bucketPath("open",(0,startHeuristic)),writeBudget)
+        opened[(0,startHeuristic)].append(boardNode.state)
+        while (len(opened) > 0):
+            key = min(opened,key=lambda k: (k[0]+k[1],k[0]))
+            (depth,h) = key
+            writer = opened.pop(key)
+            writer.close()
+            subtractPaths = [closed[old] for old in [(depth-1,h),(depth-2,h)]\
+                             if old in closed]
+            _sortUnique(writer.path,bucketPath("closed",key),subtractPaths,\
+                        runSize,bufferSize)
+            closed[key] = bucketPath("closed",key)
+            for state in _readStates(closed[key],bufferSize):
+                closedCounter.countUp()
+                if (state in goals):
+                    return _tracePath(board,heuristic,closed,state,depth)
+                for nextState in board.getSuccessors(state)[0]:
+                    nextH = heuristic(nextState)
+                    if (nextH == INFINITY):
+                        continue
+                    nextKey = (depth+1,nextH)
+                    if (nextKey in closed):
+                        raise ValueError("Heuristic is not consistent: "+\
+                                         heuristicFunction.__name__)
+                    if (not nextKey in opened):
+                        opened[nextKey] = \
+                            _StateWriter(bucketPath("open",nextKey),\
+                                         writeBudget)
+                    opened[nextKey].append(nextState)
+                    frontierCounter.countUp()
+        return None
+    finally:
+        shutil.rmtree(workDirectory)
+
+
+
+################################################################################
+if __name__ == "__main__":
+    print ("Unit test for ExternalSearch.py:  Should return no falses")
+
+    import random
+    from Board import Board
+    from BoardNode import *
+    from Search import aStarSearch
+
+    ##sorting with tiny runs must match sorting in memory
+    workDirectory = tempfile.mkdtemp()
+    randomStates = array("I",[random.randrange(0,5000) for i in range(0,3000)])
+    oldStates = array("I",sorted(set(randomStates[:700])))
+    with open(os.path.join(workDirectory,"raw"),"wb") as stateFile:
+        randomStates.tofile(stateFile)
+    with open(os.path.join(workDirectory,"old"),"wb") as stateFile:
+        oldStates.tofile(stateFile)
+    count = _sortUnique(os.path.join(workDirectory,"raw"),\
+                        os.path.join(workDirectory,"sorted"),\
+                        [os.path.join(workDirectory,"old")],100,16)
+    result = list(_readStates(os.path.join(workDirectory,"sorted"),16))
+    print (result == sorted(set(randomStates)-set(oldStates)))
+    print (count == len(result))
+    print (not os.path.exists(os.path.join(workDirectory,"raw")))
+    print (_contains(os.path.join(workDirectory,"sorted"),result[0]))
+    print (_contains(os.path.join(workDirectory,"sorted"),result[-1]))
+    print (not _contains(os.path.join(workDirectory,"sorted"),oldStates[3]))
+    shutil.rmtree(workDirectory)
+
+    ##many open writers together must keep to their shared budget, and
+    ##still write every state
+    workDirectory = tempfile.mkdtemp()
+    budget = _BufferBudget(50)
+    writers = [_StateWriter(os.path.join(workDirectory,str(i)),budget) \
+               for i in range(0,20)]
+    largest = 0
+    for state in range(0,2000):
+        writers[random.randrange(0,20)].append(state)
+        largest = max(largest,budget.total)
+    print (largest <= 50)
+    for writer in writers:
+        writer.close()
+    print (budget.total == 0 and len(budget.writers) == 0)
+    print (sorted([state for writer in writers \
+                   for state in _readStates(writer.path,7)]) == \
+           list(range(0,2000)))
+    shutil.rmtree(workDirectory)
+
+    ##external search must find paths as short as A*, even on the smallest
+    ##memory budget
+    for puzzle in ["puzzles/puzzle1.txt","puzzles/puzzle2.txt",\
+                   "puzzles/puzzle3.txt","puzzles/puzzle4.txt",\
+                   "puzzles/puzzle5.txt"]:
+        for heuristicFunction in (UniformCost,OpenPlaneDieDistance,\
+                                  MazeDistanceAccountingOrientation):
+            board = Board(puzzle)
+            startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                  Counter(),Counter())
+            path = aStarSearch(heuristicFunction,startNode)
+            startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                  Counter(),Counter())
+            externalPath = externalAStarSearch(heuristicFunction,startNode,\
+                                               memoryBudget=64)
+            if (path is None):
+                print (externalPath is None)
+            else:
+                print (len(externalPath) == len(path))
+                for direction in externalPath:
+                    print (board.isValidMoveInner(direction))
+                    board.moveDie(direction)
+                print (board.isGoalInner())
+
+    print ("This concludes tests for ExternalSearch.py")
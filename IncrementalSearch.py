@@ -0,0 +1,286 @@
+"""
+IncrementalSearch.py
+
+Replans paths on a board whose obstacles change between queries with Lifelong
+Planning A* (LPA*), which repairs its previous search instead of starting over.
+
+Authors:
+    Joseph Fuchs        <jjf2614@rit.edu>
+    Damien Cremilleux   <dxc9849@rit.edu>
+"""
+
+import heapq
+import itertools
+
+from Die import Die, ORIENTATIONS_PER_PARITY
+from BoardNode import BoardNode
+from Directions import *
+from Search import INFINITY
+
+##Static constants
+##stands for every goal state at once; the goal states lead to it for free
+_GOAL = -1
+
+class LPAStarPlanner(object):
+    """
+    Plans shortest paths from a fixed start state to the goal of one board,
+    across changes to the board's obstacles.
+
+    Every packed state has g, the path cost the last search settled on, and
+    rhs, the path cost its predecessors' g values offer now.  States where
+    the two differ are in the priority queue, ordered by
+    [min(g,rhs) + h, min(g,rhs)].  Blocking or freeing a cell only changes the
+    rhs values of the states on and next to that cell, so only those, and the
+    states whose costs change because of them, are expanded again.
+
+    g and rhs are only stored for states that have been reached; the rest are
+    INFINITY.
+    """
+    __slots__ = ("_board","_start","_goals","_heuristicFunction",\
+                 "_closedCounter","_frontierCounter","_heuristics",\
+                 "_g","_rhs","_heap","_queued","_counter")
+
+    def __init__(self,heuristicFunction,boardNode):
+        """
+        Function: (Function: BoardNode -> int) X BoardNode -> null
+
+        Description: makes a planner from boardNode's state to the goal of
+        boardNode's board.  Nothing is searched until getPath is called.  The
+        node's counters count the states expanded and queued.
+
+        Preconditions: heuristicFunction must be consistent and admissible on
+        every version of the board, so it may not look at obstacles (use
+        OpenPlaneDieDistance, ManhattanDistanceIgnoringOrientation or
+        UniformCost)
+        """
+        self._board = boardNode.board
+        self._start = boardNode.state
+        self._goals = self._board.getGoalStates()
+        self._heuristicFunction = heuristicFunction
+        self._closedCounter = boardNode.closedCounter
+        self._frontierCounter = boardNode.frontierCounter
+        self._heuristics = dict()#packed state -> h, which never changes
+        self._g = dict()
+        self._rhs = dict()
+        self._heap = list()#(key, key tie break, counter, packed state)
+        self._queued = dict()#packed state -> counter of its live heap entry
+        self._counter = itertools.count()
+        self._rhs[self._start] = 0
+        self._push(self._start)
+
+    #treat private
+    def _heuristic(self,state):
+        if (state == _GOAL):
+            return 0
+        h = self._heuristics.get(state)
+        if (h is None):
+            board = self._board
+            (location,orientation) = board.unpackState(state)
+            h = self._heuristicFunction(BoardNode(board,location,\
+                                                  Die(orientation),\
+                                                  self._closedCounter,\
+                                                  self._frontierCounter,\
+                                                  state=state))
+            self._heuristics[state] = h
+        return h
+
+    #treat private
+    def _key(self,state):
+        cost = min(self._g.get(state,INFINITY),self._rhs.get(state,INFINITY))
+        return (cost+self._heuristic(state),cost)
+
+    #treat private
+    def _push(self,state):
+        count = next(self._counter)
+        self._queued[state] = count
+        (key,tieBreak) = self._key(state)
+        heapq.heappush(self._heap,(key,tieBreak,count,state))
+        self._frontierCounter.countUp()
+
+    #treat private
+    def _topKey(self):
+        """
+        Function: null -> (int,int)
+
+        Description: throws away stale entries on top of the heap
+
+        Returns: the key of the first state in the queue, or INFINITY keys if
+        it is empty
+        """
+        heap = self._heap
+        while (len(heap) > 0):
+            (key,tieBreak,count,state) = heap[0]
+            if (self._queued.get(state) == count):
+                return (key,tieBreak)
+            heapq.heappop(heap)
+        return (INFINITY,INFINITY)
+
+    #treat private
+    def _successors(self,state):
+        if (state == _GOAL):
+            return []
+        states = list(self._board.getSuccessors(state)[0])
+        if (state in self._goals):
+            states.append(_GOAL)
+        return states
+
+    #treat private
+    def _updateState(self,state):
+        """
+        Function: int -> null
+
+        Description: recomputes the rhs value of a state from its current
+        predecessors, and queues it if it no longer matches its g value
+        """
+        if (state != self._start):
+            if (state == _GOAL):
+                rhs = min([self._g.get(goal,INFINITY) for goal in self._goals])
+            else:
+                rhs = INFINITY
+                for prev in self._board.getPredecessors(state)[0]:
+                    rhs = min(rhs,self._g.get(prev,INFINITY)+1)
+            if (rhs == INFINITY):
+                self._rhs.pop(state,None)
+            else:
+                self._rhs[state] = rhs
+        self._queued.pop(state,None)
+        if (self._g.get(state,INFINITY) != self._rhs.get(state,INFINITY)):
+            self._push(state)
+
+    #treat private
+    def _computeShortestPath(self):
+        ##a goal state's key ties with the virtual goal's, since the move
+        ##between them is free, so ties are expanded too: otherwise a goal
+        ##state whose old g value is too low is never corrected
+        g = self._g
+        rhs = self._rhs
+        while (self._topKey() <= self._key(_GOAL) or \
+                rhs.get(_GOAL,INFINITY) != g.get(_GOAL,INFINITY)):
+            if (len(self._heap) == 0):
+                return
+            state = heapq.heappop(self._heap)[3]
+            del self._queued[state]
+            self._closedCounter.countUp()
+            if (g.get(state,INFINITY) > rhs.get(state,INFINITY)):
+                g[state] = rhs[state]
+                for nextState in self._successors(state):
+                    self._updateState(nextState)
+            else:
+                g.pop(state,None)
+                for nextState in self._successors(state)+[state]:
+                    self._updateState(nextState)
+
+    #treat public
+    def getPath(self):
+        """
+        Function: null -> tuple<Direction>
+
+        Description: brings the search up to date with the board and walks
+        back from the cheapest goal state, each time to the predecessor with
+        the lowest g value
+
+        Returns: the shortest path from the start state to the goal, in the
+        form of BoardNode.getPath, or None if there is none
+        """
+        self._computeShortestPath()
+        g = self._g
+        if (g.get(_GOAL,INFINITY) == INFINITY):
+            return None
+        state = None
+        for goal in self._goals:
+            if (g.get(goal,INFINITY) == g[_GOAL]):
+                state = goal
+        path = list()
+        while (state != self._start):
+            (states,moves) = self._board.getPredecessors(state)
+            best = min(range(0,len(states)),\
+                       key=lambda i: g.get(states[i],INFINITY))
+            path.append(moves[best])
+            state = states[best]
+        path.reverse()
+        return tuple(path)
+
+    #treat public
+    def setObstacle(self,location,blocked):
+        """
+        Function: (int,int) X bool -> null
+
+        Description: blocks or frees a cell of the board (see
+        Board.setObstacle), and updates the rhs values of the states on it and
+        on the cells next to it, whose moves are the only ones that changed.
+        The search itself is repaired by the next getPath.
+        """
+        board = self._board
+        board.setObstacle(location,blocked)
+        for direction in [None]+list(Directions.DIRECTIONS):
+            if (direction is None):
+                (row,col) = location
+            else:
+                (row,col) = (location[0]+Directions.toGridVector(direction)[0],\
+                             location[1]+Directions.toGridVector(direction)[1])
+            if (row < 0 or row >= board.getHeight() or \
+                    col < 0 or col >= board.getWidth()):
+                continue
+            cell = row*board.getWidth()+col
+            for state in range(cell*ORIENTATIONS_PER_PARITY,\
+                               (cell+1)*ORIENTATIONS_PER_PARITY):
+                self._updateState(state)
+
+    #treat public
+    def toggleObstacle(self,location):
+        """
+        Function: (int,int) -> null
+
+        Description: frees the cell at location if it is blocked, and blocks it
+        otherwise
+
+        See: setObstacle
+        """
+        self.setObstacle(location,not self._board.isObstacle(location))
+
+
+
+################################################################################
+if __name__ == "__main__":
+    print ("Unit test for IncrementalSearch.py:  Should return no falses")
+
+    from Board import Board
+    from BoardNode import *
+
+    ##the planner must agree with the exact goal distances after every change
+    board = Board("puzzles/puzzle5.txt")
+    counter = Counter()
+    planner = LPAStarPlanner(OpenPlaneDieDistance,\
+                             BoardNode(board,board.getStartLocation(),Die(),\
+                                       counter,counter))
+    changes = [(2,2),(0,1),(3,4),(2,2),(1,4),(0,1),(3,4),(1,4)]
+    for cell in [None]+changes:
+        if (cell is not None):
+            planner.toggleObstacle(cell)
+        path = planner.getPath()
+        distance = board.getGoalDistances()[\
+            board.packState(board.getStartLocation(),0)]
+        if (distance == Board.UNREACHABLE):
+            print (path is None)
+        else:
+            print (len(path) == distance)
+            for direction in path:
+                print (board.isValidMoveInner(direction))
+                board.moveDie(direction)
+            print (board.isGoalInner())
+            board._die = Die()
+            board._dieLocation = board.getStartLocation()
+
+    ##a change far from the path must cost far less than the first search
+    board = Board("puzzles/puzzle5.txt")
+    closedCounter = Counter()
+    planner = LPAStarPlanner(OpenPlaneDieDistance,\
+                             BoardNode(board,board.getStartLocation(),Die(),\
+                                       closedCounter,Counter()))
+    planner.getPath()
+    firstSearch = closedCounter.getCount()
+    planner.toggleObstacle((board.getHeight()-1,board.getWidth()-1))
+    planner.getPath()
+    print (closedCounter.getCount()-firstSearch < firstSearch)
+
+    print ("This concludes tests for IncrementalSearch.py")
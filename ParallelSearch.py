@@ -0,0 +1,556 @@
+"""
+ParallelSearch.py
+
+Solves one rolling-die puzzle on several CPU cores, in two ways:
+
+Hash distributed A* (HDA*): every packed state is owned by one worker process,
+chosen by hashing it.  A worker runs A* on the states it owns and sends the 
+states it generates to their owners, so no state is ever searched by two 
+workers.
+
+A portfolio: several optimal searches, with different heuristics, frontiers
+or directions, race each other in separate processes, and the first to finish
+wins.
+
+Authors:
+    Joseph Fuchs        <jjf2614@rit.edu>
+    Damien Cremilleux   <dxc9849@rit.edu>
+"""
+
+import heapq
+import multiprocessing
+import os
+import tempfile
+import time
+import traceback
+
+from Die import Die
+from Board import Board
+from BoardNode import *
+from Search import INFINITY, INDEXED_HEAP, LAZY_HEAP, BUCKET_QUEUE
+from Search import aStarSearch, bidirectionalAStarSearch
+
+##Static constants
+##states a worker collects for another before sending them in one message
+BATCH_SIZE = 64
+##expansions between two looks at a worker's own messages
+POLL_INTERVAL = 32
+##seconds the coordinator waits between termination probes while busy
+PROBE_DELAY = 0.002
+
+##message kinds; every message is a tuple starting with one of these
+_STATES = 0#(_STATES, list of (state, g, parent state, move))
+_INCUMBENT = 1#(_INCUMBENT, cost of the best path to the goal found so far)
+_PROBE = 2#(_PROBE, wave)
+_TRACE = 3#(_TRACE, state)
+_STOP = 4#(_STOP,)
+_GOAL = 5#(_GOAL, cost, goal state)
+_COUNT = 6#(_COUNT, wave, messages sent, messages received, idle)
+_PARENT = 7#(_PARENT, parent state, move)
+_STATISTICS = 8#(_STATISTICS, states expanded, states generated)
+_ERROR = 9#(_ERROR, traceback text)
+_SOLVED = 10#(_SOLVED, configuration index, path, expanded, generated)
+
+##portfolio engines
+ASTAR = "aStar"#(ASTAR, heuristic, frontier type)
+BIDIRECTIONAL = "bidirectional"#(BIDIRECTIONAL, heuristic, reverse heuristic)
+
+##every configuration finds optimal paths; ManhattanDistanceAccountingOrientation
+##is left out since it can overestimate
+DEFAULT_PORTFOLIO = ((ASTAR,UniformCost,BUCKET_QUEUE),\
+                     (ASTAR,ManhattanDistanceIgnoringOrientation,BUCKET_QUEUE),\
+                     (ASTAR,OpenPlaneDieDistance,INDEXED_HEAP),\
+                     (ASTAR,MazeDistanceAccountingOrientation,LAZY_HEAP),\
+                     (BIDIRECTIONAL,OpenPlaneDieDistance,\
+                      ReverseOpenPlaneDieDistance))
+
+##heuristics that read one of the board's tables, which are only computed and
+##shared with the processes when a search uses one of them
+_GRID_DISTANCE_HEURISTICS = (MazeDistanceIgnoringOrientation,\
+                             MazeDistanceAccountingOrientation)
+_GOAL_DISTANCE_HEURISTICS = (ExactGoalDistance,)
+
+def _shareBoard(board,sharedFile,heuristicFunctions,successors):
+    """
+    Function: Board X string X collection<Function> X bool -> null
+
+    Description: writes the board to sharedFile with Board.saveShared, along
+    with the compiled successor graph if asked for, and only those distance
+    tables that one of the given heuristics reads
+    """
+    board.saveShared(sharedFile,successors=successors,\
+                     goalDistances=any([h in _GOAL_DISTANCE_HEURISTICS \
+                                        for h in heuristicFunctions]),\
+                     gridDistances=any([h in _GRID_DISTANCE_HEURISTICS \
+                                        for h in heuristicFunctions]))
+
+def _owner(state,workers):
+    """
+    Function: int X int -> int
+
+    Description: Knuth's multiplicative hash of a packed state, so that the
+    states of one cell, which are numbered one after another, are spread
+    over all workers
+
+    Returns: the index of the worker that owns the state
+    """
+    return ((state*2654435761) & 0xFFFFFFFF) % workers
+
+def _hdaWorker(index,sharedFile,heuristicFunction,inboxes,results):
+    """
+    Function: int X string X (Function: BoardNode -> int) X
+              list<Queue> X Queue -> null
+
+    Description: the A* loop of one worker.  States arrive in the worker's
+    inbox with the path cost they were reached with; a state is queued again
+    whenever it arrives with a lower cost than before.  Only states whose
+    f = g+h is below the cost of the best path found so far (the incumbent)
+    are expanded.  A worker that has nothing left to expand is idle, and waits
+    for messages.
+
+    The worker answers probes with how many state messages it has sent and
+    received, and whether it is idle, after sending every state it holds.
+    It answers traces with the parent of one of its states, and stops when
+    told to.
+    """
+    try:
+        board = Board.attachShared(sharedFile)
+        workers = len(inboxes)
+        goals = set(board.getGoalStates())
+        counter = Counter()
+        heuristics = dict()#state -> h
+        best = dict()#state -> (lowest g, parent state, move from the parent)
+        heap = list()#(f, g, state)
+        outboxes = [list() for i in range(0,workers)]
+        (sent,received,expanded,generated) = (0,0,0,0)
+        incumbent = INFINITY
+        inbox = inboxes[index]
+
+        def heuristic(state):
+            h = heuristics.get(state)
+            if (h is None):
+                (location,orientation) = board.unpackState(state)
+                h = heuristicFunction(BoardNode(board,location,\
+                                                Die(orientation),counter,\
+                                                counter,state=state))
+                heuristics[state] = h
+            return h
+
+        def offer(state,g,parent,move):
+            known = best.get(state)
+            if (known is not None and known[0] <= g):
+                return
+            h = heuristic(state)
+            if (h == INFINITY):
+                return
+            best[state] = (g,parent,move)
+            if (g+h < incumbent):
+                heapq.heappush(heap,(g+h,g,state))
+
+        def flush():
+            sentNow = 0
+            for owner in range(0,workers):
+                if (len(outboxes[owner]) > 0):
+                    inboxes[owner].put((_STATES,outboxes[owner]))
+                    outboxes[owner] = list()
+                    sentNow = sentNow + 1
+            return sentNow
+
+        def isIdle():
+            while (len(heap) > 0 and heap[0][1] > best[heap[0][2]][0]):
+                heapq.heappop(heap)#a cheaper copy was queued since
+            return len(heap) == 0 or heap[0][0] >= incumbent
+
+        while (True):
+            ##handle waiting messages, or wait for one if there is no work
+            if (isIdle()):
+                sent = sent + flush()
+                messages = [inbox.get()]
+            else:
+                messages = list()
+            while (True):
+                try:
+                    messages.append(inbox.get_nowait())
+                except Exception:#Queue.Empty
+                    break
+            for message in messages:
+                if (message[0] == _STATES):
+                    received = received + 1
+                    for (state,g,parent,move) in message[1]:
+                        offer(state,g,parent,move)
+                elif (message[0] == _INCUMBENT):
+                    incumbent = min(incumbent,message[1])
+                elif (message[0] == _PROBE):
+                    sent = sent + flush()
+                    results.put((_COUNT,message[1],sent,received,isIdle()))
+                elif (message[0] == _TRACE):
+                    (g,parent,move) = best[message[1]]
+                    results.put((_PARENT,parent,move))
+                elif (message[0] == _STOP):
+                    results.put((_STATISTICS,expanded,generated))
+                    return
+
+            ##expand a few states
+            for i in range(0,POLL_INTERVAL):
+                if (isIdle()):
+                    break
+                (f,g,state) = heapq.heappop(heap)
+                expanded = expanded + 1
+                if (state in goals):
+                    incumbent = g
+                    results.put((_GOAL,g,state))
+                    continue
+                (states,moves) = board.getSuccessors(state)
+                for j in range(0,len(states)):
+                    generated = generated + 1
+                    owner = _owner(states[j],workers)
+                    if (owner == index):
+                        offer(states[j],g+1,state,moves[j])
+                    else:
+                        outboxes[owner].append((states[j],g+1,state,moves[j]))
+                        if (len(outboxes[owner]) >= BATCH_SIZE):
+                            inboxes[owner].put((_STATES,outboxes[owner]))
+                            outboxes[owner] = list()
+                            sent = sent + 1
+            sent = sent + flush()
+    except Exception:
+        results.put((_ERROR,traceback.format_exc()))
+
+def _coordinate(startState,workers,inboxes,results):
+    """
+    Function: int X int X list<Queue> X Queue -> (int, int)
+
+    Description: seeds the search and detects its end.  Goal costs reported
+    by workers are sent to every worker as the new incumbent.  The search is
+    over when two probe waves in a row find every worker idle, and find the
+    same number of state messages sent as received: then no message was on
+    its way during or between the waves that could wake a worker (the four
+    counter method).  Since every worker is idle, no state with f below the
+    incumbent is left, so the incumbent is optimal.
+
+    Returns: (the cost of the best path, its goal state), or (INFINITY, None)
+    """
+    inboxes[_owner(startState,workers)].put((_STATES,[(startState,0,None,None)]))
+    parentSent = 1
+    incumbent = INFINITY
+    goalState = None
+    previous = None
+    wave = 0
+    while (True):
+        wave = wave + 1
+        for inbox in inboxes:
+            inbox.put((_PROBE,wave))
+        (answers,sent,received,idle) = (0,parentSent,0,True)
+        while (answers < workers):
+            message = results.get()
+            if (message[0] == _GOAL):
+                if (message[1] < incumbent):
+                    (incumbent,goalState) = (message[1],message[2])
+                    for inbox in inboxes:
+                        inbox.put((_INCUMBENT,incumbent))
+            elif (message[0] == _COUNT and message[1] == wave):
+                answers = answers + 1
+                sent = sent + message[2]
+                received = received + message[3]
+                idle = idle and message[4]
+            elif (message[0] == _ERROR):
+                raise RuntimeError("HDA* worker failed:\n"+message[1])
+        if (idle and sent == received):
+            if (previous == (sent,received)):
+                return (incumbent,goalState)
+            previous = (sent,received)
+        else:
+            previous = None
+            time.sleep(PROBE_DELAY)
+
+def _trace(goalState,workers,inboxes,results):
+    """
+    Function: int X int X list<Queue> X Queue -> tuple<Direction>
+
+    Description: walks back from the goal state by asking the owner of each
+    state for its parent.  A worker that fails instead of answering raises
+    a RuntimeError, as in _coordinate.
+
+    Returns: the moves from the start state to the goal state
+    """
+    path = list()
+    state = goalState
+    while (True):
+        inboxes[_owner(state,workers)].put((_TRACE,state))
+        message = results.get()
+        while (message[0] != _PARENT):
+            if (message[0] == _ERROR):
+                raise RuntimeError("HDA* worker failed:\n"+message[1])
+            message = results.get()
+        (kind,parent,move) = message
+        if (parent is None):
+            break
+        path.append(move)
+        state = parent
+    path.reverse()
+    return tuple(path)
+
+def hashDistributedAStarSearch(heuristicFunction,boardNode,workers=None,\
+                               directory=None):
+    """
+    Function: (Function: BoardNode -> int) X BoardNode X int X string ->
+              tuple<Direction>
+
+    Description: finds the optimal path from boardNode to the goal with A*
+    spread over the given number of worker processes (one per CPU by
+    default).  The board's grid is shared with the workers through a file 
+    made by Board.saveShared, in a temporary folder under directory (or the
+    system's default) that is removed when the search ends.  Nothing is 
+    compiled or searched before the workers start: each works out the 
+    successors of the states it expands from the grid.  Only a distance 
+    table the heuristic reads is computed first and shared with them, so 
+    that the workers do not each build it.
+
+    Since the workers do not expand states in exactly the order of f, a
+    state can be expanded again when it arrives later with a lower cost.
+
+    Returns: the path to the goal, in the form of BoardNode.getPath, or None
+    if there is none
+
+    Preconditions: heuristicFunction must be admissible, and a module level
+    function, so that the workers can call it
+
+    Note: the node counters count the states expanded and generated by all
+    workers together, re-expansions included
+    """
+    if (workers is None):
+        workers = multiprocessing.cpu_count()
+    (handle,sharedFile) = tempfile.mkstemp(prefix="sdmaze",dir=directory)
+    os.close(handle)
+    try:
+        _shareBoard(boardNode.board,sharedFile,[heuristicFunction],False)
+        inboxes = [multiprocessing.Queue() for i in range(0,workers)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_hdaWorker,\
+                                             args=(i,sharedFile,\
+                                                   heuristicFunction,\
+                                                   inboxes,results)) \
+                     for i in range(0,workers)]
+        for process in processes:
+            process.daemon = True
+            process.start()
+        try:
+            (cost,goalState) = _coordinate(boardNode.state,workers,inboxes,\
+                                           results)
+            if (goalState is None):
+                return None
+            return _trace(goalState,workers,inboxes,results)
+        finally:
+            for inbox in inboxes:
+                inbox.put((_STOP,))
+            stopped = 0
+            while (stopped < workers):
+                try:
+                    message = results.get(timeout=1)
+                except Exception:#Queue.Empty
+                    if (any([process.is_alive() for process in processes])):
+                        continue
+                    break#a worker died without answering
+                if (message[0] == _STATISTICS):
+                    stopped = stopped + 1
+                    boardNode.closedCounter.countUp(message[1])
+                    boardNode.frontierCounter.countUp(message[2])
+            for process in processes:
+                process.join()
+    finally:
+        os.remove(sharedFile)
+
+
+def configurationName(configuration):
+    """
+    Function: tuple -> string
+
+    Returns: a readable name for a portfolio configuration, such as
+    "aStar/OpenPlaneDieDistance/indexedHeap"
+    """
+    (engine,heuristicFunction,option) = configuration
+    if (engine == BIDIRECTIONAL):
+        option = option.__name__
+    return engine+"/"+heuristicFunction.__name__+"/"+option
+
+def _portfolioWorker(index,sharedFile,configuration,location,orientation,\
+                     results):
+    """
+    Function: int X string X tuple X (int,int) X int X Queue -> null
+
+    Description: solves the shared board from the given die state with one
+    portfolio configuration, and reports the path and node counts
+    """
+    try:
+        board = Board.attachShared(sharedFile)
+        closedCounter = Counter()
+        frontierCounter = Counter()
+        startNode = BoardNode(board,location,Die(orientation),closedCounter,\
+                              frontierCounter)
+        (engine,heuristicFunction,option) = configuration
+        if (engine == BIDIRECTIONAL):
+            path = bidirectionalAStarSearch(heuristicFunction,option,startNode,\
+                                            goalBoardNodes(board,\
+                                                           closedCounter,\
+                                                           frontierCounter))
+        else:
+            path = aStarSearch(heuristicFunction,startNode,option)
+        results.put((_SOLVED,index,path,closedCounter.getCount(),\
+                     frontierCounter.getCount()))
+    except Exception:
+        results.put((_ERROR,traceback.format_exc()))
+
+def portfolioSearch(boardNode,configurations=DEFAULT_PORTFOLIO,directory=None):
+    """
+    Function: BoardNode X sequence<tuple> X string -> 
+              (tuple<Direction>, string, float)
+
+    Description: races the given configurations, each in its own process, and
+    stops the others as soon as one finishes.  Every configuration is an
+    optimal search, so the first answer is an optimal one.  The board is
+    compiled once and shared with the processes through a file made by
+    Board.saveShared, in a temporary folder under directory (or the system's
+    default) that is removed when the search ends.  A distance table is only
+    computed and shared first if one of the configurations' heuristics reads
+    it; nothing is solved before the race.
+
+    A configuration is (ASTAR, heuristic, frontier type) or (BIDIRECTIONAL,
+    heuristic, reverse heuristic), with module level heuristics that are
+    consistent and admissible.
+
+    Returns: (the path to the goal in the form of BoardNode.getPath, or None
+    if there is none, the configurationName of the winner, the seconds from
+    the start of the first process to the winner's answer)
+
+    Preconditions: boardNode must be the board's start state if a
+    bidirectional configuration is used
+
+    Note: the node counters count the nodes of the winner only
+    """
+    (handle,sharedFile) = tempfile.mkstemp(prefix="sdmaze",dir=directory)
+    os.close(handle)
+    try:
+        heuristicFunctions = list()
+        for (engine,heuristicFunction,option) in configurations:
+            heuristicFunctions.append(heuristicFunction)
+            if (engine == BIDIRECTIONAL):
+                heuristicFunctions.append(option)
+        _shareBoard(boardNode.board,sharedFile,heuristicFunctions,True)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_portfolioWorker,\
+                                             args=(i,sharedFile,\
+                                                   configurations[i],\
+                                                   boardNode.location,\
+                                                   boardNode.die.getOrientation(),\
+                                                   results)) \
+                     for i in range(0,len(configurations))]
+        startTime = time.time()
+        for process in processes:
+            process.daemon = True
+            process.start()
+        try:
+            failures = list()
+            while (True):
+                message = results.get()
+                if (message[0] == _SOLVED):
+                    (kind,index,path,expanded,generated) = message
+                    boardNode.closedCounter.countUp(expanded)
+                    boardNode.frontierCounter.countUp(generated)
+                    return (path,configurationName(configurations[index]),\
+                            time.time()-startTime)
+                failures.append(message[1])
+                if (len(failures) == len(configurations)):
+                    raise RuntimeError("Every portfolio configuration failed:\n"\
+                                       +failures[0])
+        finally:
+            for process in processes:
+                if (process.is_alive()):
+                    process.terminate()
+                process.join()
+    finally:
+        os.remove(sharedFile)
+
+
+
+################################################################################
+if __name__ == "__main__":
+    print ("Unit test for ParallelSearch.py:  Should return no falses")
+
+    ##every worker count must find paths as short as A*
+    for puzzle in ["puzzles/puzzle1.txt","puzzles/puzzle2.txt",\
+                   "puzzles/puzzle3.txt","puzzles/puzzle4.txt",\
+                   "puzzles/puzzle5.txt"]:
+        for heuristicFunction in (UniformCost,OpenPlaneDieDistance):
+            for workers in (1,3):
+                board = Board(puzzle)
+                startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                      Counter(),Counter())
+                path = aStarSearch(heuristicFunction,startNode)
+                closedCounter = Counter()
+                startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                      closedCounter,Counter())
+                parallelPath = hashDistributedAStarSearch(heuristicFunction,\
+                                                          startNode,workers)
+                print (closedCounter.getCount() > 0)
+                if (path is None):
+                    print (parallelPath is None)
+                else:
+                    print (len(parallelPath) == len(path))
+                    for direction in parallelPath:
+                        print (board.isValidMoveInner(direction))
+                        board.moveDie(direction)
+                    print (board.isGoalInner())
+
+    ##heuristics that read the board's tables must find them in the workers
+    board = Board("puzzles/puzzle5.txt")
+    startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                          Counter(),Counter())
+    length = len(aStarSearch(UniformCost,startNode))
+    for heuristicFunction in (MazeDistanceIgnoringOrientation,\
+                              ExactGoalDistance):
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        parallelPath = hashDistributedAStarSearch(heuristicFunction,\
+                                                  startNode,2)
+        print (len(parallelPath) == length)
+
+    ##a worker that fails while the path is traced must not hang the search
+    inboxes = [multiprocessing.Queue()]
+    results = multiprocessing.Queue()
+    results.put((_ERROR,"Traceback"))
+    try:
+        _trace(5,1,inboxes,results)
+        print (False)
+    except RuntimeError:
+        print (True)
+
+    ##every portfolio configuration must find paths as short as A*, and so
+    ##must the portfolio
+    for puzzle in ["puzzles/puzzle2.txt","puzzles/puzzle3.txt",\
+                   "puzzles/puzzle5.txt"]:
+        board = Board(puzzle)
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              Counter(),Counter())
+        path = aStarSearch(OpenPlaneDieDistance,startNode)
+        names = list()
+        for configuration in DEFAULT_PORTFOLIO+(None,):
+            if (configuration is None):
+                configurations = DEFAULT_PORTFOLIO
+            else:
+                configurations = (configuration,)
+            closedCounter = Counter()
+            startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                                  closedCounter,Counter())
+            (portfolioPath,name,seconds) = portfolioSearch(startNode,\
+                                                           configurations)
+            print (closedCounter.getCount() > 0)
+            print (seconds > 0)
+            print (name in [configurationName(c) for c in configurations])
+            names.append(name)
+            if (path is None):
+                print (portfolioPath is None)
+            else:
+                print (len(portfolioPath) == len(path))
+        print (len(set(names)) == len(DEFAULT_PORTFOLIO))
+
+    print ("This concludes tests for ParallelSearch.py")
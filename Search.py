@@ -16,6 +16,11 @@ Dates editted:
     Oct. 6th, 2014 (initial revision)
 """
 
+import heapq
+import itertools
+import numbers
+from array import array
+
 from PriorityQueue import *
 
 ################################################################################
@@ -80,6 +85,59 @@ class SearchNode(object):
         """
         raise Exception("__hash__ not implemented for "\
                         +self.__class__.__str__())
+    
+    """OPTIONAL
+    Subclasses whose world states can be numbered densely from 0 may implement
+    the following.  The search functions then keep per-state bookkeeping in 
+    flat arrays instead of hashsets.
+    """
+    def getStateIndex(self):
+        """
+        Function: null -> int
+        
+        Description: a number in [0, getStateCount()) that identifies the world
+        state of this node; two nodes have the same index iff they are equal
+        
+        Returns: the state index, or None if states are not densely numbered
+        """
+        return None
+    def getStateCount(self):
+        """
+        Function: null -> int
+        
+        Returns: the number of world states, or None if states are not densely
+        numbered
+        """
+        return None
+    
+    """OPTIONAL
+    Subclasses whose moves can all be undone may implement the following, for
+    frontierAStarSearch.
+    """
+    def getOperator(self):
+        """
+        Function: null -> int
+        
+        Returns: the small non-negative number of the move that generated this
+        node, or None for the initial state
+        """
+        return None
+    def reverseOperator(self,operator):
+        """
+        Function: int -> int
+        
+        Returns: the number of the move that undoes the given move
+        """
+        raise Exception("reverseOperator not implemented for "\
+                        +self.__class__.__str__())
+    def forgetParent(self):
+        """
+        Function: null -> null
+        
+        Description: drops whatever this node keeps of the nodes before it, so
+        that they can be freed.  getPath then starts from this node.
+        """
+        return
 
 ################################################################################  
 class PathTracingSearchNode(SearchNode):
@@ -163,6 +221,9 @@ class EvaluatedNode(SearchNode):
 ################################################################################
 #####BEST FIRST SEARCH##########################################################
 
+##an evaluation of INFINITY marks a dead end; such nodes are never pushed
+INFINITY = float("inf")
+
 ##x and y are tuples: (eval, SearchNode)
 def hasLowerCostThan(x,y):
     """x and y are EvaluatedNodes"""
@@ -182,51 +243,349 @@ class BestFirstSearchNode(EvaluatedNode,PathTracingSearchNode):
         return
     def notifyExpansion(self):
         return
+    def getTieBreak(self):
+        """
+        Function: null -> int
+        
+        Description: used by the heapq based frontiers to order nodes that have
+        equal evaluations; lower values are popped first.
+        
+        Returns: the tie breaking value of this node
+        """
+        return 0
 class _PrioritySet(PriorityQueue):
     """Minor Class
-    Represents a priority queue combined with a set to provide O(logn) retrieval
-    time as well as O(1) access time for checking contents
+    Represents a priority queue combined with a map from each item to its slot
+    in the heap, to provide O(logn) pushing, popping and replacing, as well as
+    O(1) access time for checking contents and finding items
     """
-    __slots__ = ("_hiddenSet",)
+    __slots__ = ("_heapIndex",)
     def __init__(self,comparator):
         super(_PrioritySet,self).__init__(comparator)
-        self._hiddenSet = set()#TODO: change to a map for O(logn) pushing
+        self._heapIndex = dict()#item -> index of the item in heapArray
+    def _swap(self,i,j):
+        heap = self.heapArray
+        (heap[i],heap[j]) = (heap[j],heap[i])
+        self._heapIndex[heap[i]] = i
+        self._heapIndex[heap[j]] = j
     def push(self,hashable):
         """
         Replaces equivalent nodes.  If they compare differently, the new one 
         will be heapified back in place
         """
-        if hashable in self._hiddenSet:
-            ##replace the old hashable with the new one
-            for ind in range(0,len(self.heapArray)):
-                if self.heapArray[ind] == hashable:
-                    self.heapArray[ind] = hashable
-                    self._siftUp(ind)
-                    break
-            for ind in range(0,len(self.heapArray)):
-                if self.heapArray[ind] == hashable:
-                    self._sinkDown(ind)
-                    break
+        ind = self._heapIndex.get(hashable)
+        if (ind is not None):
+            ##replace the old hashable with the new one; the key is reinserted
+            ##so that the map does not keep the old one alive
+            del self._heapIndex[hashable]
+            self._heapIndex[hashable] = ind
+            self.heapArray[ind] = hashable
+            self._siftUp(ind)
+            self._sinkDown(self._heapIndex[hashable])
         else:
-            super(_PrioritySet,self).push(hashable)
-            self._hiddenSet.add(hashable)
+            ind = len(self.heapArray)
+            self.heapArray.append(hashable)
+            self._heapIndex[hashable] = ind
+            self._siftUp(ind)
     def pop(self):
-        val = super(_PrioritySet,self).pop()
-        self._hiddenSet.remove(val)
+        heap = self.heapArray
+        val = heap[0]
+        last = heap.pop()
+        del self._heapIndex[val]
+        if (len(heap) > 0):
+            heap[0] = last
+            self._heapIndex[last] = 0
+            self._sinkDown(0)
         return val
     def __contains__(self,item):
-        return (item in self._hiddenSet)
+        return (item in self._heapIndex)
+    def find(self,hashable):
+        """
+        Function: SearchNode -> SearchNode
+        Note that this compares world state, not other state
+        """
+        ind = self._heapIndex.get(hashable)
+        if (ind is not None):
+            return self.heapArray[ind]
+
+class _LazyPrioritySet(object):
+    """Minor Class
+    Has the same interface as _PrioritySet, but is built on the C heapq module.
+    Heap entries are (evaluation, tie break, counter, node) tuples so that heapq
+    only ever compares numbers.  Replacing a node pushes a new entry and leaves
+    the old one in the heap; stale entries are thrown away when popped.
+    """
+    __slots__ = ("_heap","_live","_counter","_sign")
+    def __init__(self,costMode=True):
+        self._heap = list()
+        self._live = dict()#node -> the node whose heap entry is current
+        self._counter = itertools.count()
+        if (costMode):
+            self._sign = 1
+        else:#utility mode; the largest evaluation must come out first
+            self._sign = -1
+    def push(self,hashable):
+        """
+        Replaces equivalent nodes.  The replaced node's entry becomes stale.
+        """
+        live = self._live
+        if (hashable in live):
+            del live[hashable]#so that the map does not keep the old one alive
+        live[hashable] = hashable
+        heapq.heappush(self._heap,(self._sign*hashable.getEvaluation(),\
+                                   hashable.getTieBreak(),\
+                                   next(self._counter),hashable))
+    #assumes not empty
+    def pop(self):
+        heap = self._heap
+        live = self._live
+        while (True):
+            node = heapq.heappop(heap)[3]
+            if (live.get(node) is node):
+                del live[node]
+                return node
+    def isEmpty(self):
+        return len(self._live) == 0
+    def __contains__(self,item):
+        return (item in self._live)
+    def find(self,hashable):
+        """
+        Function: SearchNode -> SearchNode
+        Note that this compares world state, not other state
+        """
+        return self._live.get(hashable)
+    def __iter__(self):
+        """
+        Iterates over the nodes in the set, in no particular order
+        """
+        return iter(self._live)
+
+class _BucketPrioritySet(object):
+    """Minor Class
+    Has the same interface as _PrioritySet, but is a bucket (Dial) queue: 
+    nodes are kept in one list per evaluation value, so pushing and popping are
+    O(1).  Only usable in cost mode with non-negative integer evaluations, such
+    as A* with unit move costs and integer heuristics.  Nodes within a bucket 
+    come out last in first out, which favours the most recently generated 
+    (usually deepest) nodes.  Replaced nodes are left in their bucket and
+    skipped when popped.
+    """
+    __slots__ = ("_buckets","_live","_minBucket")
+    def __init__(self,costMode=True):
+        if (not costMode):
+            raise ValueError("A bucket queue frontier only supports cost mode")
+        self._buckets = list()#evaluation -> list of nodes
+        self._live = dict()#node -> the node whose bucket entry is current
+        self._minBucket = 0#no live node has a lower evaluation than this
+    def push(self,hashable):
+        """
+        Replaces equivalent nodes.  The replaced node's entry becomes stale.
+        """
+        evaluation = hashable.getEvaluation()
+        if (not isinstance(evaluation,numbers.Integral)):
+            raise TypeError("A bucket queue frontier needs integer evaluations"\
+                            +", got "+str(evaluation))
+        if (evaluation < 0):
+            raise ValueError("A bucket queue frontier needs non-negative "\
+                             +"evaluations, got "+str(evaluation))
+        buckets = self._buckets
+        while (len(buckets) <= evaluation):
+            buckets.append(list())
+        buckets[evaluation].append(hashable)
+        if (evaluation < self._minBucket):
+            self._minBucket = evaluation
+        live = self._live
+        if (hashable in live):
+            del live[hashable]#so that the map does not keep the old one alive
+        live[hashable] = hashable
+    #assumes not empty
+    def pop(self):
+        live = self._live
+        while (True):
+            bucket = self._buckets[self._minBucket]
+            while (len(bucket) > 0):
+                node = bucket.pop()
+                if (live.get(node) is node):
+                    del live[node]
+                    return node
+            self._minBucket = self._minBucket + 1
+    def isEmpty(self):
+        return len(self._live) == 0
+    def __contains__(self,item):
+        return (item in self._live)
     def find(self,hashable):
         """
         Function: SearchNode -> SearchNode
         Note that this compares world state, not other state
         """
-        for ind in range(0,len(self.heapArray)):
-            if self.heapArray[ind] == hashable:
-                return self.heapArray[ind]
+        return self._live.get(hashable)
+
+class _BoundedPrioritySet(object):
+    """Minor Class
+    Has the same interface as _PrioritySet, but never holds more than limit
+    nodes: once a push goes over it, the node with the worst evaluation is 
+    dropped.  Nodes sit in two heaps of (evaluation, tie break, counter) 
+    keys, a min heap to pop the best and a max heap (negated keys) to drop
+    the worst, so both cost O(log limit).  Replaced, popped and dropped 
+    entries are left in the other heap and skipped when they reach its top;
+    once a heap holds more than twice limit entries it is rebuilt from the
+    live ones, so neither ever holds more than 2*limit+1.
+    """
+    __slots__ = ("_best","_worst","_live","_counter","_sign","_limit")
+    def __init__(self,limit,costMode=True):
+        if (limit < 1):
+            raise ValueError("Frontier limit must be at least 1")
+        self._best = list()#(key, tie break, counter, node)
+        self._worst = list()#(-key, -tie break, -counter, node)
+        self._live = dict()#node -> its counter
+        self._counter = itertools.count()
+        if (costMode):
+            self._sign = 1
+        else:#utility mode; the largest evaluation must come out first
+            self._sign = -1
+        self._limit = limit
+    def _isLive(self,node,count):
+        entry = self._live.get(node)
+        return entry is not None and entry[0] == count
+    def _compact(self):
+        self._best = [entry for entry in self._best \
+                      if self._isLive(entry[3],entry[2])]
+        heapq.heapify(self._best)
+        self._worst = [entry for entry in self._worst \
+                       if self._isLive(entry[3],-entry[2])]
+        heapq.heapify(self._worst)
+    def push(self,hashable):
+        """
+        Replaces equivalent nodes, then drops the worst node if there are too
+        many.  That may be the one just pushed.
+        """
+        live = self._live
+        key = self._sign*hashable.getEvaluation()
+        tieBreak = hashable.getTieBreak()
+        count = next(self._counter)
+        live.pop(hashable,None)#so the map lets go of the old node
+        live[hashable] = (count,hashable)
+        heapq.heappush(self._best,(key,tieBreak,count,hashable))
+        heapq.heappush(self._worst,(-key,-tieBreak,-count,hashable))
+        if (len(live) > self._limit):
+            worst = self._worst
+            while (True):
+                (key,tieBreak,count,node) = heapq.heappop(worst)
+                if (self._isLive(node,-count)):
+                    del live[node]
+                    break
+        if (len(self._best) > 2*self._limit or \
+                len(self._worst) > 2*self._limit):
+            self._compact()
+    #assumes not empty
+    def pop(self):
+        best = self._best
+        while (True):
+            (key,tieBreak,count,node) = heapq.heappop(best)
+            if (self._isLive(node,count)):
+                del self._live[node]
+                return node
+    def isEmpty(self):
+        return len(self._live) == 0
+    def __contains__(self,item):
+        return (item in self._live)
+    def find(self,hashable):
+        """
+        Function: SearchNode -> SearchNode
+        Note that this compares world state, not other state
+        """
+        entry = self._live.get(hashable)
+        if (entry is None):
+            return None
+        return entry[1]
+
+class _RecentClosedSet(object):
+    """Minor Class
+    A closed set that only remembers the last limit nodes added to it, for
+    beams over nodes that are not densely indexed.  Only supports what
+    bestFirstSearch needs of its closed set.
+    """
+    __slots__ = ("_ring","_members","_next")
+    def __init__(self,limit):
+        self._ring = [None]*limit
+        self._members = set()
+        self._next = 0
+    def add(self,node):
+        if (node in self._members):
+            return
+        old = self._ring[self._next]
+        if (old is not None):
+            self._members.discard(old)
+        self._ring[self._next] = node
+        self._members.add(node)
+        self._next = (self._next+1) % len(self._ring)
+    def __contains__(self,node):
+        return (node in self._members)
+
+class _StateBitset(object):
+    """Minor Class
+    A set of densely indexed search nodes, stored as one bit per world state.
+    Only supports what bestFirstSearch needs of its closed set.
+    """
+    __slots__ = ("_bits",)
+    def __init__(self,stateCount):
+        self._bits = bytearray((stateCount+7)//8)
+    def add(self,node):
+        index = node.getStateIndex()
+        self._bits[index >> 3] |= (1 << (index & 7))
+    def __contains__(self,node):
+        index = node.getStateIndex()
+        return ((self._bits[index >> 3] >> (index & 7)) & 1) == 1
+
+class _PathCostTable(object):
+    """Minor Class
+    The lowest path cost (evaluatePath) seen so far for every densely indexed
+    world state, stored as one unsigned int per state.
+    """
+    UNSEEN = 0xFFFFFFFF
+    __slots__ = ("_costs",)
+    def __init__(self,stateCount):
+        self._costs = array("I",[_PathCostTable.UNSEEN])*stateCount
+    def lower(self,node):
+        """
+        Function: SearchNode -> bool
+        
+        Description: records the path cost of node for its state if it is lower
+        than the one recorded so far
+        
+        Returns: True iff the recorded cost was lowered
+        """
+        index = node.getStateIndex()
+        cost = node.evaluatePath()
+        if (cost < self._costs[index]):
+            self._costs[index] = cost
+            return True
+        return False
+
+##frontier types for bestFirstSearch
+INDEXED_HEAP = "indexedHeap"#_PrioritySet
+LAZY_HEAP    = "lazyHeap"#_LazyPrioritySet
+BUCKET_QUEUE = "bucketQueue"#_BucketPrioritySet
+
+def _newFrontier(frontierType,comparator,costMode):
+    """
+    Function: string X (Function: Type X Type -> bool) X bool -> PrioritySet
+    
+    Description: makes an empty graph search frontier of the given type
+    
+    Returns: the new frontier
+    """
+    if (frontierType == INDEXED_HEAP):
+        return _PrioritySet(comparator)
+    elif (frontierType == LAZY_HEAP):
+        return _LazyPrioritySet(costMode)
+    elif (frontierType == BUCKET_QUEUE):
+        return _BucketPrioritySet(costMode)
+    raise ValueError("Unknown frontier type: "+str(frontierType))
 
 def bestFirstSearch(evaluationFunction,startNode,\
-                    graphSearch=True,costMode=True):
+                    graphSearch=True,costMode=True,frontierType=INDEXED_HEAP,\
+                    pathCostPruning=False,frontierLimit=None):
     """
     Function: (Function: BestFSN -> int) X BestFSN -> arbitrary path datatype
     
@@ -242,6 +601,33 @@ def bestFirstSearch(evaluationFunction,startNode,\
     
     Mutates: The search nodes may change internally only if the 
     evaluationFunction does so.
+    
+    frontierType picks the graph search frontier (INDEXED_HEAP, LAZY_HEAP or
+    BUCKET_QUEUE).  LAZY_HEAP orders nodes by evaluation first and 
+    getTieBreak() second.  BUCKET_QUEUE needs cost mode and non-negative
+    integer evaluations.
+    
+    If the nodes are densely indexed (see SearchNode.getStateIndex), the 
+    closed set is a bitset.  If pathCostPruning is also set, the lowest path
+    cost of every state is kept in a flat table and successors that do not
+    lower it are dropped without being evaluated.  This is only sound when 
+    the evaluation is the path cost plus a function of the world state alone,
+    as in A*.
+    
+    Nodes that evaluate to INFINITY are dropped, so if the start node does the
+    search ends at once.
+    
+    If frontierLimit is set, the graph search frontier holds at most that many
+    nodes, the best by evaluation, and frontierType is ignored.  Nodes pushed 
+    out are forgotten, not closed, so they can be found again later.  This is
+    a beam search, and neither optimality nor completeness are kept.  It can
+    not be combined with pathCostPruning, which would never let a forgotten 
+    state back in.  The frontier stays within frontierLimit nodes, and the 
+    closed set within one bit per state for densely indexed nodes, or else
+    within the last frontierLimit closed nodes, so states closed before those
+    may be opened again.  What still grows is the paths: every node keeps its
+    parent, so up to frontierLimit chains of ancestors, as long as the search
+    is deep, stay alive.
     """
     
     ##set whether we are in cost mode or utility mode
@@ -251,12 +637,34 @@ def bestFirstSearch(evaluationFunction,startNode,\
         comparator = hasBetterUtilityThan
     
     if (graphSearch):
-        frontier = _PrioritySet(comparator)#doesn't store 2 w/ same world state
+        #doesn't store 2 w/ same world state
+        if (frontierLimit is not None):
+            if (pathCostPruning):
+                raise ValueError("A frontier limit can not be combined with "+\
+                                 "path cost pruning")
+            frontier = _BoundedPrioritySet(frontierLimit,costMode)
+        else:
+            frontier = _newFrontier(frontierType,comparator,costMode)
         startNode.evaluate(evaluationFunction)
+        if (startNode.getEvaluation() == INFINITY):
+            return None
 
         frontier.push(startNode)
         
-        closed = set()
+        stateCount = startNode.getStateCount()
+        if (stateCount is None and frontierLimit is not None):
+            closed = _RecentClosedSet(frontierLimit)
+            costs = None
+        elif (stateCount is None):
+            closed = set()
+            costs = None
+        else:
+            closed = _StateBitset(stateCount)
+            if (pathCostPruning):
+                costs = _PathCostTable(stateCount)
+                costs.lower(startNode)
+            else:
+                costs = None
         while (not frontier.isEmpty()):
             curNode = frontier.pop()
             ##TRACING############
@@ -271,7 +679,17 @@ def bestFirstSearch(evaluationFunction,startNode,\
             #nodes are implemented to track their path/parent on creation
             successors = curNode.successorStates()
             for suc in successors:
+                if (costs is not None):
+                    #the table stands in for comparing against the old node
+                    if ((not suc in closed) and costs.lower(suc)):
+                        suc.evaluate(evaluationFunction)
+                        if (suc.getEvaluation() != INFINITY):
+                            suc.notifyExpansion()
+                            frontier.push(suc)#replaces old if there is one
+                    continue
                 suc.evaluate(evaluationFunction)
+                if (suc.getEvaluation() == INFINITY):
+                    continue
                 if (not suc in closed):
                     if (not suc in frontier):
                         ##TRACING############
@@ -324,8 +742,14 @@ class AStarSearchNode(BestFirstSearchNode):
         Description: Initializes search node to a given g value
         """
         super(AStarSearchNode,self).__init__()
+    
+    def getTieBreak(self):
+        """
+        Among nodes with equal f values, prefer the deepest (highest g)
+        """
+        return -self.evaluatePath()
 
-def aStarSearch(heuristicFunction,aStarSearchNode):
+def aStarSearch(heuristicFunction,aStarSearchNode,frontierType=INDEXED_HEAP):
     """
     Function: (Function: ASSN -> int) X ASSN -> arbitrary path datatype
     
@@ -338,13 +762,751 @@ def aStarSearch(heuristicFunction,aStarSearchNode):
     Preconditions: heuristicFunction must be conistent and admissible
     
     Mutates: The search nodes will change internally
+    
+    See: bestFirstSearch for frontierType
+    """
+    def f(assn):
+        """
+        Lambda Function: ASSN -> int
+        """
+        return heuristicFunction(assn) + assn.evaluatePath()
+    return bestFirstSearch(f,aStarSearchNode,frontierType=frontierType,\
+                           pathCostPruning=True)
+
+def beamSearch(heuristicFunction,aStarSearchNode,beamWidth):
+    """
+    Function: (Function: ASSN -> int) X ASSN X int -> arbitrary path datatype
+    
+    Description: A* evaluation with a frontier that holds at most beamWidth 
+    nodes; see bestFirstSearch's frontierLimit
+    
+    Returns: a sequence representing a path to the goal, or None if none was 
+    found.  The path need not be optimal, and a path may exist even if none 
+    was found.
+    
+    Mutates: The search nodes will change internally
+    """
+    def f(assn):
+        """
+        Lambda Function: ASSN -> int
+        """
+        return heuristicFunction(assn) + assn.evaluatePath()
+    return bestFirstSearch(f,aStarSearchNode,frontierLimit=beamWidth)
+
+################################################################################
+#####SIMPLIFIED MEMORY BOUNDED A STAR SEARCH####################################
+class _MemoryTreeNode(object):
+    """Minor Class
+    A search node kept in memory by memoryBoundedAStarSearch, along with its
+    place in the search tree and its backed up f value
+    """
+    __slots__ = ("node","parent","children","f","forgotten","depth",\
+                 "version","alive")
+    def __init__(self,node,parent,f):
+        self.node = node
+        self.parent = parent
+        self.children = list()#the children still in memory
+        self.f = f
+        self.forgotten = INFINITY#the lowest f among forgotten children
+        if (parent is None):
+            self.depth = 0
+        else:
+            self.depth = parent.depth+1
+        self.version = 0#raised whenever its heap entries go stale
+        self.alive = True
+    def isLeaf(self):
+        return len(self.children) == 0
+    def openValue(self):
+        """
+        Returns: the f value this node is opened at: its own for a leaf, that
+        of its best forgotten child otherwise (INFINITY if it has none)
+        """
+        if (self.isLeaf()):
+            return self.f
+        return self.forgotten
+    def isAncestorOrSelf(self,node):
+        tree = self
+        while (tree is not None):
+            if (tree.node == node):
+                return True
+            tree = tree.parent
+        return False
+
+def memoryBoundedAStarSearch(heuristicFunction,aStarSearchNode,memoryLimit):
+    """
+    Function: (Function: ASSN -> int) X ASSN X int -> arbitrary path datatype
+    
+    Description: SMA*, a tree search that behaves like A* until memoryLimit 
+    nodes are held, and then makes room by forgetting the leaf with the 
+    highest f (the shallowest one, among equals).  Its parent remembers the 
+    lowest f of its forgotten children, and is opened again at that value to
+    regenerate them once everything else looks worse.  f values are backed up
+    from children to parents, so a parent's f is the lowest f below it.  
+    
+    States already on a node's path are not generated again, and neither are
+    states held in memory at no greater path cost, since those can go on 
+    from there (and, if forgotten, are regenerated by their own parent).  A 
+    node as deep as the memory allows that is not a goal is given an f of 
+    INFINITY, since a path through it could not be held.
+    
+    Returns: a sequence representing the path to the goal, or None if no goal
+    can be reached within memoryLimit moves.  The path is optimal if the 
+    shallowest optimal path has fewer than memoryLimit moves.
+    
+    Preconditions: heuristicFunction must be admissible
+    
+    Mutates: The search nodes will change internally
+    """
+    if (memoryLimit < 2):
+        raise ValueError("SMA* needs room for at least 2 nodes")
+    openHeap = list()#(openValue, -depth, counter, tree node, version)
+    leafHeap = list()#(-f, depth, counter, tree node, version)
+    counter = itertools.count()
+    held = dict()#search node -> the cheapest tree node held for its state
+    def touch(tree):
+        """
+        Lambda Function: _MemoryTreeNode -> null
+        Re-files a tree node in the heaps after it changed
+        """
+        tree.version += 1
+        value = tree.openValue()
+        if (value != INFINITY or tree.isLeaf()):
+            heapq.heappush(openHeap,(value,-tree.depth,next(counter),tree,\
+                                     tree.version))
+        if (tree.isLeaf() and tree.parent is not None):
+            heapq.heappush(leafHeap,(-tree.f,tree.depth,next(counter),tree,\
+                                     tree.version))
+    def backUp(tree):
+        """
+        Lambda Function: _MemoryTreeNode -> null
+        Raises f values from tree upwards to the lowest f below each node
+        """
+        while (tree is not None and not tree.isLeaf()):
+            f = min([child.f for child in tree.children]+[tree.forgotten])
+            if (f == tree.f):
+                return
+            tree.f = f
+            touch(tree)
+            tree = tree.parent
+    
+    startNode = aStarSearchNode
+    root = _MemoryTreeNode(startNode,None,\
+                           heuristicFunction(startNode)+startNode.evaluatePath())
+    touch(root)
+    held[startNode] = root
+    used = 1
+    while (len(openHeap) > 0):
+        (value,negDepth,count,best,version) = heapq.heappop(openHeap)
+        if (not best.alive or version != best.version):
+            continue
+        if (value == INFINITY):
+            return None
+        best.node.notifyClosing()
+        if (best.node.isGoal()):
+            return best.node.getPath()
+        
+        ##(re)generate the children that are not in memory
+        best.forgotten = INFINITY
+        for suc in best.node.successorStates():
+            if (best.isAncestorOrSelf(suc)):
+                continue
+            if (any([child.node == suc for child in best.children])):
+                continue
+            old = held.get(suc)
+            if (old is not None and \
+                    old.node.evaluatePath() <= suc.evaluatePath()):
+                continue
+            h = heuristicFunction(suc)
+            if (h == INFINITY or \
+                    (best.depth+1 >= memoryLimit-1 and not suc.isGoal())):
+                f = INFINITY
+            else:
+                f = max(best.f,h+suc.evaluatePath())
+            suc.notifyExpansion()
+            child = _MemoryTreeNode(suc,best,f)
+            best.children.append(child)
+            held.pop(suc,None)#so that the map keeps the new search node
+            held[suc] = child
+            used += 1
+            touch(child)
+        if (best.isLeaf()):#nothing to generate; a dead end
+            best.f = INFINITY
+            touch(best)
+            backUp(best.parent)
+        else:
+            touch(best)
+            backUp(best)
+        
+        ##forget the worst leaves until the limit is kept
+        while (used > memoryLimit):
+            (negF,depth,count,worst,version) = heapq.heappop(leafHeap)
+            if (not worst.alive or version != worst.version or \
+                    not worst.isLeaf()):
+                continue
+            worst.alive = False
+            used -= 1
+            if (held.get(worst.node) is worst):
+                del held[worst.node]
+            parent = worst.parent
+            parent.children.remove(worst)
+            parent.forgotten = min(parent.forgotten,worst.f)
+            if (parent.isLeaf()):#its f is now that of its forgotten children
+                parent.f = parent.forgotten
+                touch(parent)
+                backUp(parent.parent)
+            else:
+                touch(parent)
+    return None
+
+
+################################################################################
+#####FRONTIER A STAR SEARCH#####################################################
+def _frontierSearch(evaluationFunction,startNode,target,pathCostBound,\
+                    evaluationBound,middle,keepPaths,frontierType):
+    """
+    Function: (Function: ASSN -> int) X ASSN X ASSN X int X int X int X bool X
+              string -> (ASSN, ASSN)
+    
+    Description: an A* search that keeps no closed set.  Every open node has a
+    bitmask of the operators that lead back to nodes already generated from 
+    it, and those are never applied again, so closed nodes are not 
+    regenerated.  Nodes forget their parents unless keepPaths is set, and 
+    instead carry the relay: their first ancestor whose path cost reached 
+    middle, or, if middle is None, whose path cost reached half its 
+    evaluation.
+    
+    The search ends at target, or at any goal if target is None.  Nodes whose
+    path cost goes over pathCostBound or whose evaluation goes over 
+    evaluationBound are dropped.
+    
+    Returns: (the node found, its relay), or None if nothing was found.  The
+    relay may be None.
+    """
+    def reachesMiddle(node):
+        if (middle is None):
+            return 2*node.evaluatePath() >= node.getEvaluation()
+        return node.evaluatePath() >= middle
+    
+    frontier = _newFrontier(frontierType,hasLowerCostThan,True)
+    openInfo = dict()#open node -> (used operator bitmask, relay)
+    startNode.evaluate(evaluationFunction)
+    evaluation = startNode.getEvaluation()
+    if (evaluation == INFINITY or evaluation > evaluationBound):
+        return None
+    if (reachesMiddle(startNode)):
+        openInfo[startNode] = (0,startNode)
+    else:
+        openInfo[startNode] = (0,None)
+    frontier.push(startNode)
+    while (not frontier.isEmpty()):
+        curNode = frontier.pop()
+        (used,relay) = openInfo.pop(curNode)
+        curNode.notifyClosing()
+        if (target is None):
+            if (curNode.isGoal()):
+                return (curNode,relay)
+        elif (curNode == target):
+            return (curNode,relay)
+        for suc in curNode.successorStates():
+            operator = suc.getOperator()
+            if ((used >> operator) & 1):
+                continue
+            if (not keepPaths):
+                suc.forgetParent()
+            back = 1 << suc.reverseOperator(operator)
+            old = frontier.find(suc)
+            if (old is not None):
+                (oldUsed,oldRelay) = openInfo[old]
+                openInfo[old] = (oldUsed | back,oldRelay)
+                if (suc.evaluatePath() >= old.evaluatePath()):
+                    continue
+                back = back | oldUsed
+            if (suc.evaluatePath() > pathCostBound):
+                continue
+            suc.evaluate(evaluationFunction)
+            evaluation = suc.getEvaluation()
+            if (evaluation == INFINITY or evaluation > evaluationBound):
+                continue
+            suc.notifyExpansion()
+            if (relay is None and reachesMiddle(suc)):
+                sucRelay = suc
+            else:
+                sucRelay = relay
+            if (old is not None):
+                del openInfo[old]#so that the map does not keep the old one
+            openInfo[suc] = (back,sucRelay)
+            frontier.push(suc)#replaces old if there is one
+    return None
+
+def _frontierSegment(evaluationFunction,startNode,target,targetCost,\
+                     evaluationBound,frontierType):
+    """
+    Function: (Function: ASSN -> int) X ASSN X ASSN X int X int X string -> 
+              arbitrary path datatype
+    
+    Description: rebuilds the optimal path from startNode to target, which is
+    known to be reachable at path cost targetCost, by finding the node half
+    way and rebuilding both halves.  Short segments are searched with their
+    paths kept.
+    
+    Returns: the path from startNode to target
+    """
+    startCost = startNode.evaluatePath()
+    middle = startCost + (targetCost-startCost+1)//2
+    if (targetCost-startCost > 1):
+        (end,relay) = _frontierSearch(evaluationFunction,startNode,target,\
+                                      targetCost,evaluationBound,middle,\
+                                      False,frontierType)
+        relayCost = relay.evaluatePath()
+        if (startCost < relayCost and relayCost < targetCost):
+            return _frontierSegment(evaluationFunction,startNode,relay,\
+                                    relayCost,evaluationBound,frontierType)+\
+                   _frontierSegment(evaluationFunction,relay,end,targetCost,\
+                                    evaluationBound,frontierType)
+    (end,relay) = _frontierSearch(evaluationFunction,startNode,target,\
+                                  targetCost,evaluationBound,middle,True,\
+                                  frontierType)
+    return end.getPath()
+
+def frontierAStarSearch(heuristicFunction,aStarSearchNode,\
+                        frontierType=INDEXED_HEAP):
+    """
+    Function: (Function: ASSN -> int) X ASSN -> arbitrary path datatype
+    
+    Description: given a search node and a heuristic evaluation function, this
+    will find the optimal path to the goal while keeping only the open list:
+    each open node records which of its operators lead back to nodes that were
+    already generated (see _frontierSearch), in place of a closed set.
+    
+    The path is rebuilt by divide and conquer.  Every node carries the state
+    half way along its path, so the goal search yields a middle node, and the
+    start to middle and middle to goal halves are searched again in the same
+    way, pruned by the cost found, until the pieces are single moves.
+    
+    Returns: a sequence representing the path to the goal, or None if there is
+    none
+    
+    Preconditions: heuristicFunction must be consistent and admissible, and 
+    the nodes must implement getOperator, reverseOperator and forgetParent,
+    with every move undoable by its reverse operator
+    
+    Mutates: The search nodes will change internally
+    
+    See: bestFirstSearch for frontierType
     """
     def f(assn):
         """
         Lambda Function: ASSN -> int
         """
         return heuristicFunction(assn) + assn.evaluatePath()
-    return bestFirstSearch(f,aStarSearchNode)
+    found = _frontierSearch(f,aStarSearchNode,None,INFINITY,INFINITY,None,\
+                            False,frontierType)
+    if (found is None):
+        return None
+    (goal,relay) = found
+    startCost = aStarSearchNode.evaluatePath()
+    goalCost = goal.evaluatePath()
+    if (relay is None or relay.evaluatePath() <= startCost or \
+            relay.evaluatePath() >= goalCost):
+        #no useful middle; the cost is known now, so split it evenly
+        return _frontierSegment(f,aStarSearchNode,goal,goalCost,goalCost,\
+                                frontierType)
+    return _frontierSegment(f,aStarSearchNode,relay,relay.evaluatePath(),\
+                            goalCost,frontierType)+\
+           _frontierSegment(f,relay,goal,goalCost,goalCost,frontierType)
+
+################################################################################
+#####ITERATIVE DEEPENING A STAR SEARCH##########################################
+
+##eviction policies for _TranspositionTable
+ALWAYS_REPLACE  = "alwaysReplace"#the newest entry wins its slot
+KEEP_SHALLOWEST = "keepShallowest"#the entry with the lower path cost wins
+
+class _TranspositionTable(object):
+    """Minor Class
+    A fixed number of slots, each remembering the lowest path cost one world 
+    state was reached with and the iteration it was reached in.  States are
+    mapped to slots by hash, so two states may fight over a slot; the eviction
+    policy decides which one keeps it.
+    """
+    __slots__ = ("_keys","_costs","_iterations","_size","_policy")
+    def __init__(self,size,policy):
+        if (size < 1):
+            raise ValueError("Transposition table needs at least one slot")
+        if (policy != ALWAYS_REPLACE and policy != KEEP_SHALLOWEST):
+            raise ValueError("Unknown eviction policy: "+str(policy))
+        self._keys = [None]*size
+        self._costs = array("L",[0])*size
+        self._iterations = array("L",[0])*size
+        self._size = size
+        self._policy = policy
+    def visit(self,node,iteration):
+        """
+        Function: SearchNode X int -> bool
+        
+        Description: checks whether node's state was already reached at no
+        greater cost in this iteration, or at a strictly lower cost in an 
+        earlier one.  Either way the subtree below node holds nothing the 
+        search has not covered or will not cover more cheaply.  Otherwise
+        node is recorded, subject to the eviction policy.
+        
+        Returns: True iff node can be pruned
+        """
+        key = node.getStateIndex()
+        if (key is None):
+            key = node
+        slot = hash(key) % self._size
+        cost = node.evaluatePath()
+        if (self._keys[slot] == key):
+            old = self._costs[slot]
+            if (old < cost or \
+                    (old == cost and self._iterations[slot] == iteration)):
+                return True
+        elif (self._keys[slot] is not None and \
+                self._policy == KEEP_SHALLOWEST and \
+                self._iterations[slot] == iteration and \
+                self._costs[slot] < cost):
+            return False
+        self._keys[slot] = key
+        self._costs[slot] = cost
+        self._iterations[slot] = iteration
+        return False
+
+def iterativeDeepeningAStarSearch(heuristicFunction,aStarSearchNode,\
+                                  tableSize=0,evictionPolicy=KEEP_SHALLOWEST):
+    """
+    Function: (Function: ASSN -> int) X ASSN -> arbitrary path datatype
+    
+    Description: given a search node and a heuristic evaluation function, this
+    will find the optimal path to the goal with a series of depth first 
+    searches, each cut off at a bound on f that is raised to the lowest f 
+    that went over it the time before.  Only the current path and the 
+    unexplored siblings along it are kept, so memory grows with the solution
+    length instead of with the number of states seen.
+    
+    States already on the current path are skipped.  If tableSize is above 0,
+    a transposition table of that many slots also skips states that were 
+    reached more cheaply elsewhere (see _TranspositionTable), at the cost of
+    a few arrays of that length.  evictionPolicy is ALWAYS_REPLACE or 
+    KEEP_SHALLOWEST.
+    
+    Returns: a sequence representing the path to the goal, or None if there is
+    none
+    
+    Preconditions: heuristicFunction must be admissible
+    
+    Mutates: The search nodes will change internally
+    """
+    def f(assn):
+        """
+        Lambda Function: ASSN -> int
+        """
+        return heuristicFunction(assn) + assn.evaluatePath()
+    
+    if (tableSize > 0):
+        table = _TranspositionTable(tableSize,evictionPolicy)
+    else:
+        table = None
+    startNode = aStarSearchNode
+    startNode.evaluate(f)
+    bound = startNode.getEvaluation()
+    iteration = 0
+    while (bound != INFINITY):
+        iteration += 1
+        nextBound = INFINITY
+        if (table is not None):
+            table.visit(startNode,iteration)
+        startNode.notifyClosing()
+        if (startNode.isGoal()):
+            return startNode.getPath()
+        onPath = set([startNode])
+        stack = [(startNode,startNode.successorStates(),0)]
+        while (len(stack) > 0):
+            (node,successors,i) = stack[-1]
+            if (i == len(successors)):
+                stack.pop()
+                onPath.discard(node)
+                continue
+            stack[-1] = (node,successors,i+1)
+            suc = successors[i]
+            if (suc in onPath):
+                continue
+            suc.evaluate(f)
+            evaluation = suc.getEvaluation()
+            if (evaluation == INFINITY):
+                continue
+            suc.notifyExpansion()
+            if (evaluation > bound):
+                if (evaluation < nextBound):
+                    nextBound = evaluation
+                continue
+            if (table is not None and table.visit(suc,iteration)):
+                continue
+            suc.notifyClosing()
+            if (suc.isGoal()):
+                return suc.getPath()
+            onPath.add(suc)
+            stack.append((suc,suc.successorStates(),0))
+        bound = nextBound
+    return None
+
+################################################################################
+#####ANYTIME REPAIRING A STAR SEARCH############################################
+def anytimeRepairingAStarSearch(heuristicFunction,aStarSearchNode,\
+                                initialWeight=3.0,weightStep=0.5):
+    """
+    Function: (Function: ASSN -> int) X ASSN -> iterator<(path, float)>
+    
+    Description: a generator of better and better paths to the goal.  Each 
+    round is a weighted A* search on f = g + weight*h, which finds a path at
+    most weight times longer than the optimal one, and the weight starts at
+    initialWeight and drops by weightStep after each round, down to 1.
+    
+    Rounds after the first reuse the path costs found before: only the open 
+    nodes, and the closed nodes that got cheaper during the last round (the 
+    inconsistent ones), are searched again, with their evaluations redone for
+    the new weight.  A round stops as soon as the best goal found is no worse
+    than every open evaluation, so it may not expand anything at all.
+    
+    Returns: a generator that yields (path, bound) after every round, where 
+    path is the best path found so far and the optimal path is at least 
+    len(path)/bound long.  The caller can stop taking paths at any time.  The
+    last one yielded has a bound of 1 and is optimal.  Nothing is yielded if
+    there is no path.
+    
+    Preconditions: heuristicFunction must be consistent and admissible
+    
+    Mutates: The search nodes will change internally
+    """
+    best = dict()#node -> the lowest cost node seen with that state
+    heuristics = dict()#node -> its heuristic value
+    weight = float(max(initialWeight,1.0))
+    def f(assn):
+        """
+        Lambda Function: ASSN -> float
+        """
+        return assn.evaluatePath() + weight*heuristics[assn]
+    
+    startNode = aStarSearchNode
+    heuristics[startNode] = heuristicFunction(startNode)
+    if (heuristics[startNode] == INFINITY):
+        return
+    best[startNode] = startNode
+    goal = None
+    if (startNode.isGoal()):
+        goal = startNode
+    frontier = _LazyPrioritySet(True)
+    startNode.evaluate(f)
+    frontier.push(startNode)
+    inconsistent = dict()#closed node -> itself, once it got cheaper
+    while (True):
+        closed = set()
+        while (not frontier.isEmpty()):
+            curNode = frontier.pop()
+            if (goal is not None and f(goal) <= curNode.getEvaluation()):
+                frontier.push(curNode)
+                break
+            curNode.notifyClosing()
+            closed.add(curNode)
+            for suc in curNode.successorStates():
+                old = best.get(suc)
+                if (old is not None):
+                    if (old.evaluatePath() <= suc.evaluatePath()):
+                        continue
+                    del best[old]#so that the map keeps the new one
+                else:
+                    heuristics[suc] = heuristicFunction(suc)
+                best[suc] = suc
+                if (heuristics[suc] == INFINITY):
+                    continue
+                if (suc.isGoal() and (goal is None or \
+                        suc.evaluatePath() < goal.evaluatePath())):
+                    goal = suc
+                if (suc in closed):
+                    inconsistent.pop(suc,None)
+                    inconsistent[suc] = suc
+                else:
+                    suc.evaluate(f)
+                    suc.notifyExpansion()
+                    frontier.push(suc)#replaces old if there is one
+        if (goal is None):
+            return
+        
+        ##every unfound path goes through an open or inconsistent node
+        goalCost = goal.evaluatePath()
+        lowest = min([node.evaluatePath()+heuristics[node] \
+                      for node in itertools.chain(frontier,inconsistent)] \
+                     + [INFINITY])
+        if (lowest >= goalCost):
+            bound = 1.0
+        elif (lowest <= 0):
+            bound = weight
+        else:
+            bound = min(weight,float(goalCost)/lowest)
+        yield (goal.getPath(),bound)
+        if (bound <= 1.0):
+            return
+        
+        weight = max(1.0,weight-weightStep)
+        nextFrontier = _LazyPrioritySet(True)
+        for node in itertools.chain(frontier,inconsistent):
+            node.evaluate(f)
+            nextFrontier.push(node)
+        frontier = nextFrontier
+        inconsistent = dict()
+
+################################################################################
+#####BIDIRECTIONAL A STAR SEARCH################################################
+class _SearchSide(object):
+    """Minor Class
+    The open list, best known nodes and closed set of one direction of a 
+    bidirectional search
+    """
+    __slots__ = ("heap","pathCostHeap","best","closed","counter",\
+                 "evaluationFunction")
+    def __init__(self,evaluationFunction):
+        self.heap = list()#(f, -g, counter, node) tuples
+        self.pathCostHeap = list()#(g, counter, node) tuples of the same nodes
+        self.best = dict()#node -> the lowest cost node seen with that state
+        self.closed = set()
+        self.counter = itertools.count()
+        self.evaluationFunction = evaluationFunction
+    def offer(self,node):
+        """
+        Function: AStarSearchNode -> bool
+        
+        Description: pushes node if it is the cheapest way seen to its state
+        and is not a dead end
+        
+        Returns: True iff the node was pushed
+        """
+        if (node in self.closed):
+            return False
+        old = self.best.get(node)
+        if (old is not None and old.evaluatePath() <= node.evaluatePath()):
+            return False
+        node.evaluate(self.evaluationFunction)
+        if (node.getEvaluation() == INFINITY):
+            return False
+        if (old is not None):
+            del self.best[node]#so that the map does not keep the old one alive
+        self.best[node] = node
+        count = next(self.counter)
+        heapq.heappush(self.heap,(node.getEvaluation(),node.getTieBreak(),\
+                                  count,node))
+        heapq.heappush(self.pathCostHeap,(node.evaluatePath(),count,node))
+        return True
+    def _isOpen(self,node):
+        return self.best.get(node) is node and not node in self.closed
+    def topEvaluation(self):
+        """
+        Function: null -> int
+        
+        Description: throws away stale entries on top of the open list
+        
+        Returns: the lowest f value in the open list, or INFINITY if empty
+        """
+        heap = self.heap
+        while (len(heap) > 0):
+            if (self._isOpen(heap[0][3])):
+                return heap[0][0]
+            heapq.heappop(heap)
+        return INFINITY
+    def topPathCost(self):
+        """
+        Function: null -> int
+        
+        Description: throws away stale entries on top of the path cost heap
+        
+        Returns: the lowest g value in the open list, or INFINITY if empty
+        """
+        heap = self.pathCostHeap
+        while (len(heap) > 0):
+            if (self._isOpen(heap[0][2])):
+                return heap[0][0]
+            heapq.heappop(heap)
+        return INFINITY
+    def popTop(self):
+        """
+        Preconditions: topEvaluation() was just called and was not INFINITY
+        """
+        node = heapq.heappop(self.heap)[3]
+        self.closed.add(node)
+        return node
+
+def bidirectionalAStarSearch(heuristicFunction,reverseHeuristicFunction,\
+                             startNode,goalNodes,minMoveCost=1):
+    """
+    Function: (Function: ASSN -> int) X (Function: ASSN -> int) X ASSN X
+              collection<ASSN> -> arbitrary path datatype
+    
+    Description: finds the optimal path to the goal by growing a forward 
+    search from startNode and a backward search from every goal node at once,
+    until they meet.  The backward nodes' successorStates must give the states
+    that can reach them in one move, and their getPath must give the path from
+    them to the goal in a form that can be added (+) onto a forward path.
+    Forward and backward nodes with the same world state must be equal.
+    
+    The side with the smaller open list is expanded next.  Every path not found
+    yet runs through an open node of each side, so it is at least as long as 
+    the lowest f value of either open list, and at least as long as the two 
+    lowest g values plus one move (minMoveCost).  The search stops once the 
+    best meeting found so far is no longer than all of those bounds.
+    
+    Returns: the path from start to goal, or None if there is none
+    
+    Preconditions: heuristicFunction must be consistent and admissible towards
+    the goal, and reverseHeuristicFunction towards the start
+    
+    Mutates: The search nodes will change internally
+    """
+    def forwardF(assn):
+        return heuristicFunction(assn) + assn.evaluatePath()
+    def backwardF(assn):
+        return reverseHeuristicFunction(assn) + assn.evaluatePath()
+    forward = _SearchSide(forwardF)
+    backward = _SearchSide(backwardF)
+    
+    bestCost = INFINITY
+    meeting = None#(forward node, backward node)
+    if (forward.offer(startNode)):
+        startNode.notifyExpansion()
+    for goal in goalNodes:
+        if (backward.offer(goal)):
+            goal.notifyExpansion()
+    for goal in goalNodes:
+        if (goal == startNode):
+            bestCost = 0
+            meeting = (startNode,goal)
+    
+    while (True):
+        lowerBound = max(forward.topEvaluation(),backward.topEvaluation(),\
+                         forward.topPathCost()+backward.topPathCost()+\
+                         minMoveCost)
+        if (bestCost <= lowerBound):
+            break
+        if (len(forward.best)-len(forward.closed) <= \
+                len(backward.best)-len(backward.closed)):
+            (side,other) = (forward,backward)
+        else:
+            (side,other) = (backward,forward)
+        curNode = side.popTop()
+        curNode.notifyClosing()
+        for suc in curNode.successorStates():
+            if (side.offer(suc)):
+                suc.notifyExpansion()
+                match = other.best.get(suc)
+                if (match is not None):
+                    cost = suc.evaluatePath() + match.evaluatePath()
+                    if (cost < bestCost):
+                        bestCost = cost
+                        if (side is forward):
+                            meeting = (suc,match)
+                        else:
+                            meeting = (match,suc)
+    if (meeting is None):
+        return None
+    return meeting[0].getPath() + meeting[1].getPath()
 
 
 
@@ -424,12 +1586,12 @@ if __name__ == "__main__":
     print obj1b.__hash__()
     pq.push(obj1)
     obj2 = Test(1,2,99999)#should hash and equate to same
-    print (len(pq.heapArray) == len(pq._hiddenSet) and len(pq.heapArray) == 1)
+    print (len(pq.heapArray) == len(pq._heapIndex) and len(pq.heapArray) == 1)
     print (obj2.__hash__())
     print (obj1 == obj2)
     pq.push(obj1)
     pq.push(obj2)
-    print (len(pq.heapArray) == len(pq._hiddenSet) and len(pq.heapArray) == 1)
+    print (len(pq.heapArray) == len(pq._heapIndex) and len(pq.heapArray) == 1)
     obj2b = pq.pop()
     print (obj2 is obj2b)
     print (obj1 < obj2)
@@ -473,6 +1635,11 @@ if __name__ == "__main__":
     pq.push(Test(4,4,0))
     pq.push(Test(8,4,0))
     pr(pq)
+    ##every item must know its own slot in the heap
+    print (all([pq._heapIndex[pq.heapArray[i]] == i \
+                for i in range(0,len(pq.heapArray))]))
+    print (pq.find(Test(8,4)).c == 0)
+    print (pq.find(Test(7,7)) is None)
     print ("XXXXXXXXXXX")
     while (not pq.isEmpty()):
         print (pq.pop())
@@ -483,4 +1650,91 @@ if __name__ == "__main__":
     newQ.push(Test(0,0,4))
     newQ.push(Test(1,1,4))
     
+    print ("TESTING: _LazyPrioritySet")
+    class LazyTest(Test):
+        __slots__ = ()
+        def getEvaluation(self):
+            return self.c
+        def getTieBreak(self):
+            return 0
+    lazyQ = _LazyPrioritySet()
+    lazyQ.push(LazyTest(0,0,5))
+    lazyQ.push(LazyTest(1,1,3))
+    lazyQ.push(LazyTest(2,2,4))
+    better = LazyTest(0,0,1)
+    lazyQ.push(better)#replaces (0,0,5)
+    print (LazyTest(0,0) in lazyQ)
+    print (lazyQ.find(LazyTest(0,0)) is better)
+    print (lazyQ.pop() is better)
+    print (not (LazyTest(0,0) in lazyQ))
+    print (lazyQ.pop().c == 3)
+    print (lazyQ.pop().c == 4)
+    print (lazyQ.isEmpty())
+    utilQ = _LazyPrioritySet(False)
+    utilQ.push(LazyTest(0,0,5))
+    utilQ.push(LazyTest(1,1,8))
+    print (utilQ.pop().c == 8)
+    
+    print ("TESTING: _BucketPrioritySet")
+    bucketQ = _BucketPrioritySet()
+    bucketQ.push(LazyTest(0,0,5))
+    bucketQ.push(LazyTest(1,1,3))
+    bucketQ.push(LazyTest(2,2,3))
+    better = LazyTest(0,0,1)
+    bucketQ.push(better)#replaces (0,0,5)
+    print (bucketQ.find(LazyTest(0,0)) is better)
+    print (bucketQ.pop() is better)
+    print (bucketQ.pop() == LazyTest(2,2))#last in, first out
+    bucketQ.push(LazyTest(3,3,2))#lower than the last popped bucket
+    print (bucketQ.pop() == LazyTest(3,3))
+    print (bucketQ.pop() == LazyTest(1,1))
+    print (bucketQ.isEmpty())
+    
+    print ("TESTING: _BoundedPrioritySet")
+    boundedQ = _BoundedPrioritySet(2)
+    boundedQ.push(LazyTest(0,0,5))
+    boundedQ.push(LazyTest(1,1,3))
+    boundedQ.push(LazyTest(2,2,4))#drops (0,0,5)
+    print (not (LazyTest(0,0) in boundedQ))
+    boundedQ.push(LazyTest(3,3,9))#drops itself
+    print (not (LazyTest(3,3) in boundedQ))
+    better = LazyTest(2,2,1)
+    boundedQ.push(better)#replaces (2,2,4)
+    print (boundedQ.find(LazyTest(2,2)) is better)
+    print (boundedQ.pop() is better)
+    print (boundedQ.pop().c == 3)
+    print (boundedQ.isEmpty())
+    
+    boundedQ = _BoundedPrioritySet(3)
+    for i in range(0,50):#replaces and drops leave stale entries behind
+        boundedQ.push(LazyTest(i % 5,i % 5,(i*7) % 11))
+    print (len(boundedQ._best) <= 7 and len(boundedQ._worst) <= 7)
+    popped = [boundedQ.pop().c for i in range(0,3)]
+    print (popped == sorted(popped) and boundedQ.isEmpty())
+    
+    print ("TESTING: _RecentClosedSet")
+    recent = _RecentClosedSet(2)
+    for i in [1,2,2,3]:
+        recent.add(LazyTest(i,i))
+    print (not (LazyTest(1,1) in recent))
+    print (LazyTest(2,2) in recent and LazyTest(3,3) in recent)
+    
+    print ("TESTING: _StateBitset and _PathCostTable")
+    class IndexedTest(LazyTest):
+        __slots__ = ()
+        def getStateIndex(self):
+            return self.x
+        def evaluatePath(self):
+            return self.c
+    closedBits = _StateBitset(20)
+    closedBits.add(IndexedTest(9,0))
+    print (IndexedTest(9,0,5) in closedBits)
+    print (not (IndexedTest(8,0) in closedBits))
+    print (not (IndexedTest(17,0) in closedBits))
+    costTable = _PathCostTable(20)
+    print (costTable.lower(IndexedTest(3,0,7)))
+    print (not costTable.lower(IndexedTest(3,0,7)))
+    print (costTable.lower(IndexedTest(3,0,2)))
+    print (costTable.lower(IndexedTest(4,0,9)))
+    
     print ("This concludes tests for Search.py")
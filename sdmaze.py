@@ -4,6 +4,44 @@ Main.py
 Takes in an a list of rolling-die-puzzle files from the command line and, if it
 exists, produces a solution.
 
+Options:
+    --engine astar      A* search (default)
+    --engine ida        iterative deepening A*, for boards too big to keep
+                        every visited state in memory
+    --engine frontier   frontier A*, which keeps the open list but no closed 
+                        list
+    --engine external   external memory A*, which keeps both lists on disk
+    --engine ara        anytime repairing A*, which finds a path fast and then
+                        improves it
+    --engine beam       best first search that keeps only the best nodes of 
+                        its frontier; fast, but not always optimal
+    --engine sma        simplified memory bounded A*
+    --engine hda        hash distributed A*, which spreads one search over
+                        several processes
+    --table-size N      slots in the IDA* transposition table (0 for none)
+    --eviction POLICY   keepShallowest or alwaysReplace
+    --memory-budget MB  memory external memory A* may hold states in
+    --work-dir DIR      where external memory A* puts its files, and hash
+                        distributed A* its shared board
+    --time-limit SEC    how long anytime repairing A* may keep improving
+    --initial-weight W  heuristic weight of the first anytime A* path
+    --node-limit N      frontier size of beam search, or nodes held by SMA*
+    --distance-map      instead of solving, write the distance map and policy
+                        of every (cell, orientation) to <puzzle>.dist and 
+                        <puzzle>.policy, and print the moves needed from every
+                        cell by a die in the starting orientation
+    --map-dir DIR       where to write the distance map files instead
+    --batch             solve the puzzles in parallel without prompting, and
+                        print one line of results per puzzle and heuristic as
+                        soon as each puzzle is done
+    --workers N         processes to solve with in batch mode, or to search
+                        with in hash distributed A* (default: one per CPU)
+    --portfolio         instead of trying each heuristic in turn, race several
+                        optimal searches in separate processes and keep the
+                        first answer
+    --record FILE       with --portfolio, add a line to FILE for each puzzle
+                        naming the search that won
+
 Authors:
     Joseph Fuchs        <jjf2614@rit.edu>
     Damien Cremilleux   <dxc9849@rit.edu>
@@ -12,23 +50,279 @@ Dates editted:
     Oct, 7th.  2014     (initial revision)
 """
 
+import os
 import sys
+import time
+import argparse
+import multiprocessing
 import Search
 from copy import deepcopy
 from Die import Die
 from Board import Board
 from BoardNode import *
 from Search import aStarSearch
+from Search import iterativeDeepeningAStarSearch
+from Search import frontierAStarSearch
+from Search import anytimeRepairingAStarSearch
+from Search import beamSearch
+from Search import memoryBoundedAStarSearch
+from ExternalSearch import externalAStarSearch
+from ParallelSearch import hashDistributedAStarSearch, portfolioSearch
+from DistanceMap import writeDistanceMap, mapIndex, UNREACHABLE
 from Board import NoStartError
 
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Solves rolling-die mazes")
+    parser.add_argument("puzzles",nargs="*",help="rolling-die-puzzle files")
+    parser.add_argument("--engine",default="astar",\
+                        choices=("astar","ida","frontier","external","ara",\
+                                 "beam","sma","hda"),\
+                        help="search algorithm to use")
+    parser.add_argument("--table-size",type=int,default=1<<20,\
+                        dest="tableSize",\
+                        help="slots in the IDA* transposition table")
+    parser.add_argument("--eviction",default=Search.KEEP_SHALLOWEST,\
+                        choices=(Search.KEEP_SHALLOWEST,Search.ALWAYS_REPLACE),\
+                        help="IDA* transposition table eviction policy")
+    parser.add_argument("--memory-budget",type=int,default=64,\
+                        dest="memoryBudget",\
+                        help="megabytes of states external A* may hold")
+    parser.add_argument("--work-dir",default=None,dest="workDirectory",\
+                        help="folder for the files of external or parallel A*")
+    parser.add_argument("--time-limit",type=float,default=None,\
+                        dest="timeLimit",\
+                        help="seconds anytime A* may keep improving its path")
+    parser.add_argument("--initial-weight",type=float,default=3.0,\
+                        dest="initialWeight",\
+                        help="heuristic weight of the first anytime A* path")
+    parser.add_argument("--node-limit",type=int,default=10000,\
+                        dest="nodeLimit",\
+                        help="beam search frontier size, or SMA* node limit")
+    parser.add_argument("--distance-map",action="store_true",\
+                        dest="distanceMap",\
+                        help="write the moves needed from every start instead")
+    parser.add_argument("--map-dir",default=None,dest="mapDirectory",\
+                        help="folder for the distance map files")
+    parser.add_argument("--batch",action="store_true",\
+                        help="solve in parallel without prompting")
+    parser.add_argument("--workers",type=int,default=None,\
+                        help="processes for batch mode or hash distributed A*")
+    parser.add_argument("--portfolio",action="store_true",\
+                        help="race several optimal searches in parallel")
+    parser.add_argument("--record",default=None,\
+                        help="file to note the winning portfolio search in")
+    args = parser.parse_args()
+    if (args.batch and args.engine == "hda"):
+        parser.error("--engine hda can not be used with --batch")
+    if (args.batch and args.portfolio):
+        parser.error("--portfolio can not be used with --batch")
+    if (args.batch and args.distanceMap):
+        parser.error("--distance-map can not be used with --batch")
+    return args
+
+def anytimeSearch(heuristicFunction,startNode,timeLimit,initialWeight):
+    """
+    Function: (Function: BoardNode -> int) X BoardNode X float X float -> 
+              (tuple<Direction>, float)
+    
+    Description: takes the paths of anytime repairing A* until it finds an
+    optimal one or the time limit has passed.  The time is only checked 
+    between rounds, so the first path is always waited for, and the last 
+    round may run past the limit.
+    
+    Returns: (the last path, its suboptimality bound), or (None, None) if 
+    there is no path
+    """
+    startTime = time.time()
+    (path,bound) = (None,None)
+    for (path,bound) in anytimeRepairingAStarSearch(heuristicFunction,\
+                                                    startNode,initialWeight):
+        if (timeLimit is not None and time.time()-startTime >= timeLimit):
+            break
+    return (path,bound)
+
+def search(args,heuristicFunction,startNode):
+    """
+    Function: Namespace X (Function: BoardNode -> int) X BoardNode -> 
+              (tuple<Direction>, float)
+    
+    Description: runs the search engine chosen on the command line
+    
+    Returns: (the path found, or None, its suboptimality bound, which is 
+    only known for anytime repairing A*)
+    """
+    if (args.engine == "ida"):
+        return (iterativeDeepeningAStarSearch(heuristicFunction,startNode,\
+                                              args.tableSize,args.eviction),\
+                None)
+    elif (args.engine == "frontier"):
+        return (frontierAStarSearch(heuristicFunction,startNode),None)
+    elif (args.engine == "external"):
+        return (externalAStarSearch(heuristicFunction,startNode,\
+                                    args.memoryBudget*1024*1024,\
+                                    args.workDirectory),None)
+    elif (args.engine == "ara"):
+        return anytimeSearch(heuristicFunction,startNode,args.timeLimit,\
+                             args.initialWeight)
+    elif (args.engine == "beam"):
+        return (beamSearch(heuristicFunction,startNode,args.nodeLimit),None)
+    elif (args.engine == "sma"):
+        return (memoryBoundedAStarSearch(heuristicFunction,startNode,\
+                                         args.nodeLimit),None)
+    elif (args.engine == "hda"):
+        return (hashDistributedAStarSearch(heuristicFunction,startNode,\
+                                           args.workers,args.workDirectory),\
+                None)
+    return (aStarSearch(heuristicFunction,startNode),None)
+
+def solvePuzzle(task):
+    """
+    Function: (string, Namespace) -> (string, list<tuple>)
+    
+    Description: solves one puzzle file with every heuristic, the way main 
+    does but without printing; this is the work of one batch process
+    
+    Returns: (the puzzle file, a list holding (heuristic name, path length 
+    or None, number visited, number generated) for each heuristic), or 
+    (the puzzle file, the error message) if it could not be read
+    """
+    (filename,args) = task
+    try:
+        board = Board(filename)
+    except (IOError,NoStartError) as e:
+        return (filename,str(e))
+    if (args.engine == "astar"):
+        board.compile()
+    results = list()
+    for heuristicFunction in SequenceOfHeuristics:
+        closedCounter = Counter()
+        frontierCounter = Counter()
+        startNode = BoardNode(board,board.getStartLocation(),Die(),\
+                              closedCounter,frontierCounter)
+        (path,bound) = search(args,heuristicFunction,startNode)
+        if (path is None):
+            length = None
+        else:
+            length = len(path)
+        results.append((heuristicFunction.__name__,length,\
+                        closedCounter.getCount(),frontierCounter.getCount()))
+    return (filename,results)
+
+def batchSolve(args):
+    """
+    Function: Namespace -> null
+    
+    Description: hands the puzzle files out to a pool of processes and prints
+    the results of each puzzle as soon as it is solved, so the order of the 
+    puzzles is not kept.  Each line holds, separated by tabs, the puzzle 
+    file, the heuristic, the path length ('-' for no solution), the number 
+    visited and the number generated.
+    """
+    pool = multiprocessing.Pool(args.workers)
+    try:
+        tasks = [(filename,args) for filename in args.puzzles]
+        print ("Puzzle\tHeuristic\tLength\tNumber Visited\tNumber Generated")
+        for (filename,results) in pool.imap_unordered(solvePuzzle,tasks):
+            if (isinstance(results,str)):
+                print (filename+"\t"+results)
+            else:
+                for (name,length,visited,generated) in results:
+                    if (length is None):
+                        length = "-"
+                    print ("\t".join([filename,name,str(length),\
+                                      str(visited),str(generated)]))
+            sys.stdout.flush()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def portfolioSolve(args,filename,board):
+    """
+    Function: Namespace X string X Board -> null
+    
+    Description: solves one puzzle with portfolioSearch and prints its path
+    like main does, along with the search that won.  With --record, a tab
+    separated line of the puzzle, the winner, the path length ('-' for no 
+    solution) and the seconds the race took from the start of its processes
+    is added to the record file.
+    """
+    print ("")
+    print ("Portfolio of "+filename)
+    print (board)
+    closedCounter = Counter()
+    frontierCounter = Counter()
+    startNode = BoardNode(board,board.getStartLocation(),Die(),closedCounter,\
+                          frontierCounter)
+    (path,winner,seconds) = portfolioSearch(startNode,\
+                                            directory=args.workDirectory)
+    if path:
+        for direction in path:
+            board.moveDie(direction)
+            print (board)
+        print ("")
+        print ("Length: " + str(len(path)))
+        length = str(len(path))
+    else:
+        print ("No Solution")
+        length = "-"
+    print ("Winner: "+winner)
+    print ("Number Visited  : "+str(closedCounter.getCount())+" (including start state)")
+    print ("Number Generated: "+str(frontierCounter.getCount()))
+    if (args.record is not None):
+        record = open(args.record,"a")
+        try:
+            record.write("\t".join([filename,winner,length,\
+                                    "%.3f" % seconds])+"\n")
+        finally:
+            record.close()
+
+def printDistanceMap(board,distances):
+    """
+    Function: Board X array[int] -> null
+    
+    Description: prints the board with every free cell replaced by the moves
+    a die starting there as Die() needs to reach the goal; '*' marks 
+    obstacles and '-' cells the goal can not be reached from
+    """
+    startOrientation = Die().getOrientation()
+    for row in range(0,board.getHeight()):
+        line = list()
+        for col in range(0,board.getWidth()):
+            distance = distances[mapIndex(board,(row,col),startOrientation)]
+            if (board.isObstacle((row,col))):
+                line.append(Board.OBSTACLE)
+            elif (distance == UNREACHABLE):
+                line.append("-")
+            else:
+                line.append(str(distance))
+        print (" ".join([cell.rjust(3) for cell in line]))
+
 def main():
-    if len(sys.argv) == 1:
+    args = parseArguments()
+    if len(args.puzzles) == 0:
         print ("No Rolling-Die-Puzzle file provided.  Now exiting")
         return
-    for i in range(1,len(sys.argv)):
-        filename = sys.argv[i]
+    if (args.batch):
+        batchSolve(args)
+        return
+    for filename in args.puzzles:
         try:
             board = Board(filename)
+            if (args.distanceMap):
+                name = filename
+                if (args.mapDirectory is not None):
+                    name = os.path.join(args.mapDirectory,\
+                                        os.path.basename(filename))
+                (distances,policy) = writeDistanceMap(board,name)
+                print ("Distance map of "+filename)
+                printDistanceMap(board,distances)
+                continue
+            if (args.portfolio):
+                portfolioSolve(args,filename,board)
+                continue
+            if (args.engine == "astar"):
+                board.compile()#every heuristic below searches the same board
             startLocation = board._dieLocation
             startDie = Die()
             
@@ -40,15 +334,16 @@ def main():
                 print (board)
                 closedCounter = Counter()#global counter for node closing
                 frontierCounter = Counter()#global counter for node expansion
-                emptyPath = tuple()
-                startNode = BoardNode(board,startLocation,startDie,closedCounter,frontierCounter,emptyPath)
-                path = aStarSearch(heuristicFunction,startNode)
+                startNode = BoardNode(board,startLocation,startDie,closedCounter,frontierCounter)
+                (path,bound) = search(args,heuristicFunction,startNode)
                 if path:#if path is found
                     for direction in path:
                         board.moveDie(direction)
                         print (board)
                     print ("")
                     print ("Length: " + str(len(path)))
+                    if (args.engine == "ara"):
+                        print ("At most %.2f times the optimal length" % bound)
                 else:#if path not found
                     print ("No Solution")
                 print ("Number Visited  : "+str(closedCounter.getCount())+" (including start state)")